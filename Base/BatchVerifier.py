@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+from typing import List, Tuple, Union
+
+from gmpy2 import mpz
+
+from Base.Circuit import Circuit
+from Base.ParallelSumRootM import ParallelSumRootM
+from Unit.FieldVector import FieldVector
+from Unit.Integer import Integer
+from Unit.PowerQuery import PowerQuery
+from Unit.Proof import Proof
+from Unit.QueryAnswerer import QueryAnswerer
+from Unit.SparseQuery import SparseQuery
+
+
+class BatchVerifier:
+    """
+    Verify many proofs for the same circuit at once.
+    One challenge r is drawn after all proofs are given, so the queries are derived once and shared by every proof.
+    The two linear checks p(r) == G(f(r)) and p(M) == result are folded into one check each over a random
+    combination rho_1 * P_1 + ... + rho_N * P_N of the proofs; if a combined check fails, every proof is
+    checked on its own to find the failing ones.
+    """
+
+    @staticmethod
+    def verify(circuit: Union[Circuit, ParallelSumRootM], proofs: List[Proof], results: List[Integer],
+               input_size: int = None) -> List[bool]:
+        """
+        :param results: claimed circuit output of each proof
+        :param input_size: circuit input size, required for a Circuit
+        :return: whether each proof is accepted
+        """
+        assert len(proofs) == len(results)
+        if len(proofs) == 0:
+            return []
+
+        proof_size = proofs[0].get_size()
+        assert all(proof.get_size() == proof_size for proof in proofs)
+
+        queries = BatchVerifier.make_queries(circuit, proof_size, input_size)
+        wire_queries, p_r_query, result_query = queries[:-2], queries[-2], queries[-1]
+
+        g_r = circuit.evaluate_g_gates([QueryAnswerer.answer(proof, wire_queries) for proof in proofs])
+
+        rhos = [Integer.get_random() for _ in proofs]
+        combined = BatchVerifier.combine(proofs, rhos, [p_r_query, result_query])
+        if combined * p_r_query == Integer.inner_product(rhos, g_r) and \
+                combined * result_query == Integer.inner_product(rhos, results):
+            return [True] * len(proofs)
+
+        return [proof * p_r_query == g_r[i] and proof * result_query == results[i] for i, proof in enumerate(proofs)]
+
+    @staticmethod
+    def make_queries(circuit: Union[Circuit, ParallelSumRootM], proof_size: int,
+                     input_size: int = None) -> List[Union[SparseQuery, PowerQuery]]:
+        if isinstance(circuit, ParallelSumRootM):
+            r = Integer.get_random(mpz(circuit.get_point_count() + 1))
+            return circuit.make_queries(proof_size, r)
+
+        assert input_size is not None
+        r = Integer.get_random(mpz(circuit.get_g_gate_count() + 1))
+        return circuit.make_queries(input_size, proof_size, r)
+
+    @staticmethod
+    def combine(proofs: List[Proof], rhos: List[Integer],
+                queries: List[Union[SparseQuery, PowerQuery]]) -> Proof:
+        """
+        Return sum_i rhos[i] * proofs[i]. Only the index range the queries read is combined; the rest is zero.
+        """
+        proof_size = proofs[0].get_size()
+        start, stop = BatchVerifier.__get_range(queries, proof_size)
+
+        weights = [rho.n for rho in rhos]
+        columns = zip(*(proof.proof.values[start:stop] for proof in proofs))
+        values = [mpz(0)] * start + [FieldVector.lazy_dot(weights, column) for column in columns]
+        values.extend([mpz(0)] * (proof_size - stop))
+
+        return Proof(FieldVector(values))
+
+    @staticmethod
+    def __get_range(queries: List[Union[SparseQuery, PowerQuery]], proof_size: int) -> Tuple[int, int]:
+        start, stop = proof_size, 0
+        for query in queries:
+            if isinstance(query, PowerQuery):
+                start, stop = min(start, query.start), max(stop, query.stop)
+            elif isinstance(query, SparseQuery) and len(query.entries) > 0:
+                start, stop = min(start, min(query.entries)), max(stop, max(query.entries) + 1)
+            else:
+                return 0, proof_size
+
+        return start, max(start, stop)
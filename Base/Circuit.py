@@ -1,16 +1,22 @@
 from __future__ import annotations
 
 from abc import *
-from typing import List
+from typing import BinaryIO, Dict, Iterator, List, Tuple, Union
 
 from Base.GGate import GGate
 from Base.Gate import Add, CMul
+from Base.LinearIR import LinearIR
+from Base.QueryTemplate import QueryTemplate
+from Base.ProverPool import ProverPool
 from Unit import Integer
+from Unit.FieldVector import FieldVector
 from Unit.Integer import Integer as Int
 from Unit.Operand import Operand
+from Unit.Phase import Phase
 from Unit.Polynomial import Polynomial
-from Unit.Query import Query
 from Unit.Proof import Proof
+from Unit.PowerQuery import PowerQuery
+from Unit.SparseQuery import SparseQuery
 
 
 class Circuit(metaclass=ABCMeta):
@@ -28,69 +34,93 @@ class Circuit(metaclass=ABCMeta):
         self.add = add
         self.cmul = cmul
         self.g_gates = g_gates
+        self.__linear_ir: Dict[Tuple[int, int], LinearIR] = {}
+        self.__query_template: Dict[Tuple[int, int, int], QueryTemplate] = {}
 
     @abstractmethod
     def __call__(self, input: List[Operand]):
         pass
 
-    def make_proof(self, input: List[Integer]) -> Proof:
+    def make_proof(self, input: List[Integer], workers: int = 1) -> Proof:
+        """
+        :param workers: number of worker processes used to interpolate the wires (1 runs in this process)
+        """
+        return Proof.from_segments(self.stream_proof(input, workers))
+
+    def write_proof(self, input: List[Integer], sink: BinaryIO, workers: int = 1) -> List[Tuple[str, int]]:
+        """
+        Write the proof segments to sink as they are produced and return the segment layout
+        """
+        return Proof.write_segments(self.stream_proof(input, workers), sink)
+
+    def stream_proof(self, input: List[Integer], workers: int = 1) -> Iterator[Tuple[str, FieldVector]]:
+        """
+        Yield the proof segments in order: inputs, randoms, then G-gate polynomial coefficients
+        """
         assert len(input) > 0
 
-        self(input)
+        yield Proof.INPUT, FieldVector.from_integers(input)
+
+        with Phase.of(Phase.TRACE):
+            self(input)
 
         randoms: List[Integer] = []
 
-        g_gate_input: List[Integer][Integer] = [[Int(0) for _ in range(len(self.g_gates) + 1)] for _ in range(self.g_gates[0].get_input_size())]
+        g_gate_input: List[Integer][Integer] = [[Int.ZERO for _ in range(len(self.g_gates) + 1)] for _ in range(self.g_gates[0].get_input_size())]
         for i in range(self.g_gates[0].get_input_size()):
             g_gate_input[i][0] = Int.get_random()
             randoms.append(g_gate_input[i][0])
             for j in range(len(self.g_gates)):
                 g_gate_input[i][j + 1] = self.g_gates[j].last_input[i]
 
-        interpolated = [Polynomial.interpolate(g_gate_input[i]) for i in range(len(g_gate_input))]
-        g_gate_poly: Polynomial = self.g_gates[0].compute(interpolated)
-
-        res = []
-        res.extend(input)
-        res.extend(randoms)
-        res.extend(g_gate_poly.coefficients)
-
-        return Proof(res)
-
-    def make_queries(self, input_size: int, proof_size: int, r: Integer) -> List[Query]:
-        g_gate_input_size = self.g_gates[0].get_input_size()
-        coefficient_size = proof_size - input_size - g_gate_input_size
-
-        queries = [Query([Int(0) for _ in range(proof_size)]) for _ in range(input_size)]
-        for i in range(input_size):
-            queries[i].query[i] = Int(1)
-
-        Query.g_gate_ref = self.g_gates
-        Query.coefficient_size = coefficient_size
-        self(queries)
-
-        res = []
-        for i in range(g_gate_input_size):
-            g_gate_input = [Query([Int(1) if k == input_size + i else Int(0) for k in range(proof_size)])]
-            for j in range(len(self.g_gates)):
-                g_gate_input.append(self.g_gates[j].last_input[i])
-            res.append(Query.interpolate(g_gate_input, r))
-
-        p_r_query = [Int(0) for _ in range(proof_size)]
-        a = Int(1)
-        for i in range(coefficient_size):
-            p_r_query[input_size + g_gate_input_size + i] = a
-            a *= r
-        res.append(Query(p_r_query))
-
-        p_m_query = [Int(0) for _ in range(proof_size)]
-        a = Int(1)
-        for i in range(coefficient_size):
-            p_m_query[input_size + g_gate_input_size + i] = a
-            a *= Int(len(self.g_gates))
-        res.append(Query(p_m_query))
-
-        return res
+        yield Proof.RANDOM, FieldVector.from_integers(randoms)
+
+        interpolated = ProverPool.interpolate_all(g_gate_input, workers)
+        with Phase.of(Phase.G_POLY):
+            g_gate_poly: Polynomial = self.g_gates[0].compute(interpolated)
+
+        yield Proof.COEFFICIENT, g_gate_poly.coefficients
+
+    def compile(self, input_size: int) -> LinearIR:
+        """
+        Trace the circuit once into its linear IR. The result is cached per (prime, input size).
+        """
+        key = (Int.get_base(), input_size)
+        if key not in self.__linear_ir:
+            self.__linear_ir[key] = LinearIR(self, input_size)
+
+        return self.__linear_ir[key]
+
+    def preprocess(self, input_size: int, proof_size: int) -> QueryTemplate:
+        """
+        Build the r-independent part of the queries once. The result is cached per (prime, input size, proof size).
+        """
+        key = (Int.get_base(), input_size, proof_size)
+        if key not in self.__query_template:
+            g_gate_input_size = self.g_gates[0].get_input_size()
+            wire_queries = self.compile(input_size).make_wire_queries(proof_size)
+
+            node_queries = []
+            for i in range(g_gate_input_size):
+                g_gate_input = [SparseQuery.unit(proof_size, input_size + i)]
+                for j in range(len(self.g_gates)):
+                    g_gate_input.append(wire_queries[j][i])
+                node_queries.append(g_gate_input)
+
+            coefficient_start = input_size + g_gate_input_size
+            p_m_query = PowerQuery.powers(proof_size, coefficient_start, proof_size, Int(len(self.g_gates)))
+            self.__query_template[key] = QueryTemplate(proof_size, node_queries, coefficient_start, [p_m_query])
+
+        return self.__query_template[key]
+
+    def make_queries(self, input_size: int, proof_size: int, r: Integer) -> List[Union[SparseQuery, PowerQuery]]:
+        return self.preprocess(input_size, proof_size).make_queries(r)
+
+    def evaluate_g_gates(self, answers: List[List[Integer]]) -> List[Integer]:
+        """
+        Return G(f_1(r), ..., f_L(r)) for the wire query answers of each of many proofs
+        """
+        return self.g_gates[0].compute_batch(answers)
 
     def get_g_gate_count(self):
         return len(self.g_gates)
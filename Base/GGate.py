@@ -2,9 +2,8 @@ from abc import *
 from typing import List, Union
 
 from Base.Gate import Add, CMul, Mul
-from Unit.Integer import Integer
+from Base.LinearIR import LinearForm
 from Unit.Operand import Operand
-from Unit.Query import Query
 
 
 class GGate(metaclass=ABCMeta):
@@ -20,20 +19,13 @@ class GGate(metaclass=ABCMeta):
         self.mul = mul
         self.last_input = []
 
-    def __call__(self, input: List[Union[Operand, Query]]):
+    def __call__(self, input: List[Union[Operand, LinearForm]]):
         assert len(input) == self.get_input_size()
 
         self.last_input = input[:]
 
-        if isinstance(input[0], Query):
-            for idx, g_gate in enumerate(Query.g_gate_ref):
-                if self == g_gate:
-                    p_r_query = [Integer(0) for _ in range(input[0].get_size())]
-                    a = Integer(1)
-                    for i in range(Query.coefficient_size):
-                        p_r_query[input[0].get_size() - Query.coefficient_size + i] = a
-                        a *= Integer(idx + 1)
-                    return Query(p_r_query)
+        if isinstance(input[0], LinearForm):
+            return input[0].tracer.output_of(self)
         else:
             return self.compute(input)
 
@@ -41,6 +33,12 @@ class GGate(metaclass=ABCMeta):
     def compute(self, input: List[Operand]):
         pass
 
+    def compute_batch(self, inputs: List[List[Operand]]) -> List[Operand]:
+        """
+        Compute the gate over many independent inputs. Override to share work across the batch.
+        """
+        return [self.compute(input) for input in inputs]
+
     @abstractmethod
     def get_input_size(self):
         pass
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+from typing import Dict, List, Union, TYPE_CHECKING
+
+from gmpy2 import mpz, f_mod
+
+from Unit.Integer import Integer
+from Unit.Operand import Operand
+from Unit.PowerQuery import PowerQuery
+from Unit.SparseQuery import SparseQuery
+
+if TYPE_CHECKING:
+    from Base.Circuit import Circuit
+    from Base.GGate import GGate
+
+
+class LinearForm(Operand):
+    """
+    Symbolic operand used while tracing a circuit.
+    It is a linear combination of variables: circuit input i is variable i,
+    and the output of G-gate k is variable input_size + k.
+    """
+
+    def __init__(self, tracer: LinearIR, terms: Dict[int, mpz]):
+        self.tracer = tracer
+        self.terms: Dict[int, mpz] = terms
+
+    def __repr__(self) -> str:
+        return f'LinearForm({dict(sorted((i, int(v)) for i, v in self.terms.items()))})'
+
+    def __add__(self, other: LinearForm) -> LinearForm:
+        p = Integer.get_base()
+        res = dict(self.terms)
+        for i, v in other.terms.items():
+            s = f_mod(res.get(i, 0) + v, p)
+            if s == 0:
+                res.pop(i, None)
+            else:
+                res[i] = s
+
+        return LinearForm(self.tracer, res)
+
+    def __sub__(self, other: LinearForm) -> LinearForm:
+        return self + other * Integer(-1)
+
+    def __mul__(self, other: Integer) -> LinearForm:
+        if other.n == 0:
+            return LinearForm(self.tracer, {})
+
+        p = Integer.get_base()
+        return LinearForm(self.tracer, {i: f_mod(v * other.n, p) for i, v in self.terms.items()})
+
+
+class LinearIR:
+    """
+    Linear structure of a circuit, recorded by running its __call__ once with LinearForm operands.
+    For every G-gate input wire it keeps a sparse linear map over the circuit inputs and the G-gate outputs,
+    so query generation only has to apply the maps instead of re-tracing the circuit.
+    """
+
+    def __init__(self, circuit: Circuit, input_size: int):
+        self.input_size = input_size
+        self.g_gate_count = len(circuit.g_gates)
+        self.g_gate_input_size = circuit.g_gates[0].get_input_size()
+        self.__g_gate_index: Dict[int, int] = {id(g_gate): idx for idx, g_gate in enumerate(circuit.g_gates)}
+
+        circuit([LinearForm(self, {i: mpz(1)}) for i in range(input_size)])
+
+        # wires[j][i] is the linear map feeding input i of G-gate j
+        self.wires: List[List[Dict[int, mpz]]] = [
+            [form.terms for form in g_gate.last_input] for g_gate in circuit.g_gates
+        ]
+
+    def output_of(self, g_gate: GGate) -> LinearForm:
+        """
+        Called by a G-gate during tracing; its output becomes a fresh variable
+        """
+        return LinearForm(self, {self.input_size + self.__g_gate_index[id(g_gate)]: mpz(1)})
+
+    def make_wire_queries(self, proof_size: int) -> List[List[Union[SparseQuery, PowerQuery]]]:
+        """
+        Return the proof query of every G-gate input wire: circuit input i selects proof entry i,
+        and the output of G-gate k is p(k + 1) evaluated over the coefficient tail of the proof.
+        """
+        coefficient_start = self.input_size + self.g_gate_input_size
+
+        res = []
+        for g_gate_wires in self.wires:
+            queries = []
+            for terms in g_gate_wires:
+                entries = {}
+                powers = []
+                for var, coefficient in terms.items():
+                    if var < self.input_size:
+                        entries[var] = coefficient
+                    else:
+                        powers.append((mpz(var - self.input_size + 1), coefficient))
+
+                query = SparseQuery(proof_size, entries)
+                if len(powers) > 0:
+                    query += PowerQuery(proof_size, coefficient_start, proof_size, powers)
+                queries.append(query)
+            res.append(queries)
+
+        return res
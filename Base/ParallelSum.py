@@ -1,12 +1,22 @@
-from typing import List
+from typing import BinaryIO, Dict, Iterator, List, Tuple, Union
+
+from gmpy2 import mpz
 
 from Base.GGate import GGate
+from Base.ProverPool import ProverPool
+from Base.QueryTemplate import QueryTemplate
 from Unit import Integer
 
+from Unit.FiatShamir import FiatShamir
+from Unit.FieldVector import FieldVector
 from Unit.Operand import Operand
+from Unit.Phase import Phase
 from Unit.Polynomial import Polynomial
 from Unit.Proof import Proof
-from Unit.Query import Query
+from Unit.PowerQuery import PowerQuery
+from Unit.SparseQuery import SparseQuery
+from Unit.Transcript import Transcript
+from Unit.QueryAnswerer import QueryAnswerer
 from Unit.Integer import Integer as Int
 
 
@@ -15,13 +25,18 @@ class ParallelSum:
     Parallel-Sum circuit class for fully linear interactive oracle proof.
     """
 
-    def __init__(self, g_gates: List[GGate]):
-        assert len(g_gates) > 0
+    def __init__(self, g_gates: List[GGate], fold_factor: int = 2):
+        """
+        :param fold_factor: number of gate groups k combined per round, with a (k + 1)-point interpolation
+        """
+        assert len(g_gates) > 0 and fold_factor >= 2
 
         self.g_gates: List[GGate] = g_gates
+        self.fold_factor: int = fold_factor
         self.last_input_poly: List[Polynomial] = []
         self.last_round_proof: Proof = Proof([])
         self.current_round: int = 0
+        self.__query_template: Dict[Tuple[int, int], QueryTemplate] = {}
 
     def __call__(self, input: List[Operand]):
         assert len(input) == len(self.g_gates) * self.g_gates[0].get_input_size()
@@ -33,158 +48,262 @@ class ParallelSum:
         return sum
 
     def get_max_round(self):
-        rounds = 0
-        count = len(self.g_gates)
-        while count % 2 == 0:
-            count = count // 2
+        """
+        Number of rounds until a single gate is left, at least one
+        """
+        rounds = 1
+        count = self.fold_factor
+        while count < len(self.g_gates):
+            count *= self.fold_factor
             rounds += 1
         return rounds
 
+    def get_fold_factor(self):
+        return self.fold_factor
+
+    def get_padded_gate_count(self):
+        """
+        Gate count rounded up to fold_factor ** max_round; the extra gates are zero-gates with all-zero inputs
+        """
+        return self.fold_factor ** self.get_max_round()
+
     def get_g_gate_input_size(self):
         return self.g_gates[0].get_input_size()
 
     def get_g_gate_count(self):
         return len(self.g_gates)
 
-    def make_first_proof(self, inputs: List, is_final: bool = False) -> Proof:
-        assert len(inputs) > 0 and self.get_max_round() != 0
+    def is_well_formed(self, proof: Proof, is_last: bool) -> bool:
+        """
+        Check the segment layout of a round proof received from an untrusted prover before queries are built for it.
+        An intermediate round holds coefficients only; the last round holds the fold_factor * input_size inputs
+        and input_size randoms of the last gate, then coefficients.
+        """
+        if not is_last:
+            return all(kind == Proof.COEFFICIENT for kind, _ in proof.segments)
+
+        g_gate_input_size = self.g_gates[0].get_input_size()
+        return (len(proof.segments) == 3
+                and proof.segments[0] == (Proof.INPUT, g_gate_input_size * self.fold_factor)
+                and proof.segments[1] == (Proof.RANDOM, g_gate_input_size)
+                and proof.segments[2][0] == Proof.COEFFICIENT)
+
+    def evaluate_g_gates(self, answers: List[List[Integer]]) -> List[Integer]:
+        """
+        Return sum_i G_i(f(r)) over the last round wire query answers of each of many proofs
+        """
+        g_gate_input_size = self.g_gates[0].get_input_size()
+
+        res = [Int.ZERO] * len(answers)
+        for i in range(len(answers[0]) // g_gate_input_size if len(answers) > 0 else 0):
+            values = self.g_gates[i].compute_batch(
+                [answer[g_gate_input_size * i:g_gate_input_size * (i + 1)] for answer in answers])
+            res = [a + b for a, b in zip(res, values)]
 
-        self(inputs)
-
-        randoms = []
+        return res
 
-        g_gate_input: List[Integer][Integer] = [
-            [Int(0) for _ in range(3)] for _ in range(len(inputs) // 2)
+    def make_first_proof(self, inputs: List, is_final: bool = False, workers: int = 1) -> Proof:
+        """
+        :param workers: number of worker processes the gates are sharded across (1 runs in this process)
+        """
+        return Proof.from_segments(self.stream_first_proof(inputs, is_final, workers))
+
+    def write_first_proof(self, inputs: List, sink: BinaryIO, is_final: bool = False,
+                          workers: int = 1) -> List[Tuple[str, int]]:
+        """
+        Write the first proof segments to sink as they are produced and return the segment layout
+        """
+        return Proof.write_segments(self.stream_first_proof(inputs, is_final, workers), sink)
+
+    def stream_first_proof(self, inputs: List, is_final: bool = False,
+                           workers: int = 1) -> Iterator[Tuple[str, FieldVector]]:
+        """
+        Yield the first proof segments in order: inputs and randoms (final round only),
+        then G-gate polynomial coefficients. The prover state advances once the first segment is requested.
+        """
+        assert len(inputs) == len(self.g_gates) * self.g_gates[0].get_input_size()
+
+        # Zero-gates fill the gate count up to a power of the fold factor; they add G(0) = 0 to the sum
+        with Phase.of(Phase.TRACE):
+            wires = list(inputs) + [Int.ZERO] * (
+                (self.get_padded_gate_count() - len(self.g_gates)) * self.g_gates[0].get_input_size())
+
+        yield from self.__stream_round(wires, is_final or self.get_max_round() == 1, 1, workers)
+
+    def make_next_proof(self, prev_random: Integer, is_final: bool = False, workers: int = 1) -> Proof:
+        """
+        :param workers: number of worker processes the gates are sharded across (1 runs in this process)
+        """
+        return Proof.from_segments(self.stream_next_proof(prev_random, is_final, workers))
+
+    def write_next_proof(self, prev_random: Integer, sink: BinaryIO, is_final: bool = False,
+                         workers: int = 1) -> List[Tuple[str, int]]:
+        """
+        Write the next round proof segments to sink as they are produced and return the segment layout
+        """
+        return Proof.write_segments(self.stream_next_proof(prev_random, is_final, workers), sink)
+
+    def stream_next_proof(self, prev_random: Integer, is_final: bool = False,
+                          workers: int = 1) -> Iterator[Tuple[str, FieldVector]]:
+        """
+        Yield the next round proof segments in order: inputs and randoms (final round only),
+        then G-gate polynomial coefficients. The prover state advances once the first segment is requested.
+        """
+        assert 0 < self.current_round < self.get_max_round()
+
+        with Phase.of(Phase.TRACE):
+            wires = Polynomial.evaluate_all(self.last_input_poly, prev_random)
+
+        yield from self.__stream_round(wires, is_final or self.get_max_round() == 1, self.current_round + 1, workers)
+
+    def __stream_round(self, wires: List[Integer], is_last: bool, round_number: int,
+                       workers: int) -> Iterator[Tuple[str, FieldVector]]:
+        """
+        Fold the gates owning wires into fold_factor groups. Wire j of the folded gates is interpolated through
+        a random value at node 0 and wire j of group i at node i + 1.
+        The last round sends its inputs and randoms while the G-gate polynomial is still to be computed.
+        The prover state is updated before the first segment is yielded, so a consumer that stops early
+        still leaves the state of a completed round.
+        """
+        group_size = len(wires) // self.fold_factor
+
+        randoms = [Int.get_random() for _ in range(group_size)]
+        g_gate_input: List[List[Integer]] = [
+            [randoms[j]] + [wires[j + i * group_size] for i in range(self.fold_factor)] for j in range(group_size)
         ]
 
-        g_gates_input_size = self.g_gates[0].get_input_size()
-
-        for j in range(len(inputs) // 2):
-            g_gate_input[j][0] = Int.get_random()
-            randoms.append(g_gate_input[j][0])
-            g_gate_number = j // g_gates_input_size
-            input_number_per_g_gate = j % g_gates_input_size
-            circuit_count_per_g_gate = len(self.g_gates) // 2
-            g_gate_input[j][1] = self.g_gates[g_gate_number].last_input[input_number_per_g_gate]
-            g_gate_input[j][2] = self.g_gates[g_gate_number + circuit_count_per_g_gate].last_input[input_number_per_g_gate]
-
-        interpolated = [Polynomial.interpolate(g_gate_input[i]) for i in range(len(inputs) // 2)]
-        g_gate_poly: Polynomial = self.g_gates[0].compute(interpolated[0:g_gates_input_size])
-        for j in range(1, len(self.g_gates) // 2):
-            g_gate_poly += self.g_gates[j].compute(interpolated[g_gates_input_size * j:g_gates_input_size * (j + 1)])
-
-        res = []
-        if is_final or self.get_max_round() == 1:
-            res.extend(inputs)
-            res.extend(randoms)
-        res.extend(g_gate_poly.coefficients)
-
-        if is_final or self.get_max_round() == 1:
+        if is_last:
+            # No state outlives the last round
             self.last_input_poly = []
             self.last_round_proof = Proof([])
             self.current_round = 0
-            return Proof(res)
-        else:
-            self.last_input_poly = interpolated
-            self.last_round_proof = Proof(res)
-            self.current_round = 1
-            return self.last_round_proof
-
-    def make_next_proof(self, prev_random: Integer, is_final: bool = False) -> Proof:
-        assert self.last_round_proof.get_size() > 0 and self.current_round < self.get_max_round()
-
-        last_input_query = Query([prev_random ** Int(i) for i in range(len(self.last_input_poly[0].coefficients))])
 
-        inputs = []
-        prev_input = []
-        for i in self.last_input_poly:
-            prev_input.append(i * last_input_query)
-        for i in range(2 ** self.current_round):
-            inputs.extend(prev_input)
+            yield Proof.INPUT, FieldVector.from_integers(wires)
+            yield Proof.RANDOM, FieldVector.from_integers(randoms)
 
-        self(inputs)
-
-        randoms = []
-
-        input_count_per_g_gate = len(inputs) // (2 ** (self.current_round + 1))
-
-        g_gate_input: List[Integer][Integer] = [
-            [Int(0) for _ in range(3)] for _ in range(input_count_per_g_gate)
-        ]
+        interpolated, g_gate_poly = ProverPool.compute_g_gate_poly(
+            self.g_gates[:group_size // self.g_gates[0].get_input_size()], g_gate_input, workers)
 
-        g_gates_input_size = self.g_gates[0].get_input_size()
-
-        for j in range(input_count_per_g_gate):
-            g_gate_input[j][0] = Int.get_random()
-            randoms.append(g_gate_input[j][0])
-            g_gate_number = j // g_gates_input_size
-            input_number_per_g_gate = j % g_gates_input_size
-            circuit_count_per_g_gate = len(self.g_gates) // (2 ** (self.current_round + 1))
-            for k in range(2):
-                g_gate_input[j][k + 1] = self.g_gates[g_gate_number + k * circuit_count_per_g_gate].last_input[
-                    input_number_per_g_gate]
-
-        interpolated = [Polynomial.interpolate(g_gate_input[i]) for i in range(input_count_per_g_gate)]
-        g_gate_poly: Polynomial = self.g_gates[0].compute(interpolated[0:g_gates_input_size])
-        for j in range(1, len(self.g_gates) // (2 ** (self.current_round + 1))):
-            g_gate_poly += self.g_gates[j].compute(interpolated[g_gates_input_size * j:g_gates_input_size * (j + 1)])
-
-        res = []
-        if is_final or self.get_max_round() == 1:
-            res.extend(prev_input)
-            res.extend(randoms)
-        res.extend(g_gate_poly.coefficients)
-
-        if is_final or self.get_max_round() == 1:
-            self.last_input_poly = []
-            self.last_round_proof = Proof([])
-            self.current_round = 0
-            return Proof(res)
-        else:
+        if not is_last:
             self.last_input_poly = interpolated
-            self.last_round_proof = Proof(res)
-            self.current_round += 1
-            return self.last_round_proof
-
-    @staticmethod
-    def make_p_query(proof_size: int, r: Integer) -> Query:
-        return Query([r ** Int(i) for i in range(proof_size)])
-
-    def make_last_queries(self, proof_size: int, r: Integer) -> List[Query]:
-        g_gate_input_size = len(self.g_gates) * self.g_gates[0].get_input_size() // (2 ** (self.get_max_round()))
-        input_size = g_gate_input_size * 2
-        coefficient_size = proof_size - input_size - g_gate_input_size
-
-        input_queries = [Query([Int(0) for _ in range(proof_size)]) for _ in range(input_size)]
-        for i in range(input_size):
-            input_queries[i].query[i] = Int(1)
-
+            self.last_round_proof = Proof(g_gate_poly.coefficients)
+            self.current_round = round_number
+
+        yield Proof.COEFFICIENT, g_gate_poly.coefficients
+
+    def make_transcript(self, inputs: List, workers: int = 1) -> Transcript:
+        """
+        Run every round non-interactively. The challenge after each round is derived from the
+        statement and all proofs so far instead of being sent by the verifier.
+        """
+        fiat_shamir = self.__make_fiat_shamir(len(inputs))
+        result = self(inputs)
+        fiat_shamir.absorb_integer(result)
+
+        proofs = []
+        r = None
+        for i in range(self.get_max_round()):
+            is_final = i == self.get_max_round() - 1
+            if i == 0:
+                proof = self.make_first_proof(inputs, is_final, workers)
+            else:
+                proof = self.make_next_proof(r, is_final, workers)
+            fiat_shamir.absorb_proof(proof)
+            proofs.append(proof)
+            r = fiat_shamir.challenge(mpz(self.fold_factor + 1))
+
+        return Transcript(result, proofs)
+
+    def verify_transcript(self, transcript: Transcript, input_size: int) -> bool:
+        return self.verify_transcripts([transcript], input_size)[0]
+
+    def verify_transcripts(self, transcripts: List[Transcript], input_size: int) -> List[bool]:
+        """
+        Verify transcripts made by make_transcript for inputs of input_size elements.
+        The last round G-gate checks of all transcripts are evaluated in one batch.
+        A malformed transcript is rejected without affecting the others.
+        """
         res = []
-        for i in range(g_gate_input_size):
-            g_gate_input = [Query([Int(1) if k == input_size + i else Int(0) for k in range(proof_size)])]
-            for j in range(2):
-                g_gate_input.append(input_queries[j * g_gate_input_size + i])
-            res.append(Query.interpolate(g_gate_input, r))
-
-        p_r_query = [Int(0) for _ in range(proof_size)]
-        a = Int(1)
-        for i in range(coefficient_size):
-            p_r_query[input_size + g_gate_input_size + i] = a
-            a *= r
-        res.append(Query(p_r_query))
-
-        p_one_query = [Int(0) for _ in range(proof_size)]
-        a = Int(1)
-        for i in range(coefficient_size):
-            p_one_query[input_size + g_gate_input_size + i] = a
-            a *= Int(1)
-        res.append(Query(p_one_query))
-
-        p_two_query = [Int(0) for _ in range(proof_size)]
-        a = Int(1)
-        for i in range(coefficient_size):
-            p_two_query[input_size + g_gate_input_size + i] = a
-            a *= Int(2)
-        res.append(Query(p_two_query))
+        last_rounds = []
+        for transcript in transcripts:
+            if len(transcript.proofs) == 0 or len(transcript.proofs) != self.get_max_round() or not all(
+                    self.is_well_formed(proof, i == len(transcript.proofs) - 1)
+                    for i, proof in enumerate(transcript.proofs)):
+                res.append(False)
+                last_rounds.append(None)
+                continue
+
+            fiat_shamir = self.__make_fiat_shamir(input_size)
+            fiat_shamir.absorb_integer(transcript.result)
+
+            is_accepted = True
+            expected = transcript.result
+            for proof in transcript.proofs[:-1]:
+                fiat_shamir.absorb_proof(proof)
+                r = fiat_shamir.challenge(mpz(self.fold_factor + 1))
+                is_accepted &= proof * self.make_sum_query(proof.get_size()) == expected
+                expected = proof * ParallelSum.make_p_query(proof.get_size(), r)
+
+            proof = transcript.proofs[-1]
+            fiat_shamir.absorb_proof(proof)
+            queries = self.make_last_queries(proof.get_size(), fiat_shamir.challenge(mpz(self.fold_factor + 1)))
+            is_accepted &= proof * queries[-1] == expected
+
+            res.append(is_accepted)
+            last_rounds.append((proof, queries))
+
+        checked = [last_round for last_round in last_rounds if last_round is not None]
+        g_r = iter(self.evaluate_g_gates([QueryAnswerer.answer(proof, queries[:-2]) for proof, queries in checked]))
+        for i, last_round in enumerate(last_rounds):
+            if last_round is not None:
+                proof, queries = last_round
+                res[i] &= proof * queries[-2] == next(g_r)
 
         return res
+
+    def __make_fiat_shamir(self, input_size: int) -> FiatShamir:
+        return FiatShamir(b'ParallelSum', [len(self.g_gates), self.g_gates[0].get_input_size(), input_size,
+                                           self.fold_factor])
+
+    @staticmethod
+    def make_p_query(proof_size: int, r: Integer) -> PowerQuery:
+        return PowerQuery.powers(proof_size, 0, proof_size, r)
+
+    def make_sum_query(self, proof_size: int, start: int = 0) -> PowerQuery:
+        """
+        Query of p(1) + ... + p(fold_factor) over the coefficients on [start, proof_size),
+        which a round proof has to match against the previous claimed sum
+        """
+        return PowerQuery(proof_size, start, proof_size, [(mpz(i), mpz(1)) for i in range(1, self.fold_factor + 1)])
+
+    def preprocess_last(self, proof_size: int) -> QueryTemplate:
+        """
+        Build the r-independent part of the last round queries once. The result is cached per (prime, proof size).
+        """
+        key = (Int.get_base(), proof_size)
+        if key not in self.__query_template:
+            # A single gate is left after the last round, fed by fold_factor gates
+            g_gate_input_size = self.g_gates[0].get_input_size()
+            input_size = g_gate_input_size * self.fold_factor
+
+            input_queries = [SparseQuery.unit(proof_size, i) for i in range(input_size)]
+
+            node_queries = []
+            for i in range(g_gate_input_size):
+                g_gate_input = [SparseQuery.unit(proof_size, input_size + i)]
+                for j in range(self.fold_factor):
+                    g_gate_input.append(input_queries[j * g_gate_input_size + i])
+                node_queries.append(g_gate_input)
+
+            coefficient_start = input_size + g_gate_input_size
+            self.__query_template[key] = QueryTemplate(proof_size, node_queries, coefficient_start, [
+                self.make_sum_query(proof_size, coefficient_start),
+            ])
+
+        return self.__query_template[key]
+
+    def make_last_queries(self, proof_size: int, r: Integer) -> List[Union[SparseQuery, PowerQuery]]:
+        """
+        Return the wire queries f(r), then p(r), then p(1) + ... + p(fold_factor)
+        """
+        return self.preprocess_last(proof_size).make_queries(r)
@@ -1,25 +1,53 @@
 import math
-from typing import List
+from typing import BinaryIO, Dict, Iterator, List, Tuple, Union
+
+from gmpy2 import mpz
 
 from Base.GGate import GGate
+from Base.ProverPool import ProverPool
+from Base.QueryTemplate import QueryTemplate
 from Unit import Integer
+from Unit.FiatShamir import FiatShamir
+from Unit.FieldVector import FieldVector
 
 from Unit.Operand import Operand
-from Unit.Polynomial import Polynomial
+from Unit.Phase import Phase
 from Unit.Proof import Proof
-from Unit.Query import Query
+from Unit.PowerQuery import PowerQuery
+from Unit.SparseQuery import SparseQuery
+from Unit.Transcript import Transcript
+from Unit.QueryAnswerer import QueryAnswerer
 from Unit.Integer import Integer as Int
 
 
 class ParallelSumRootM:
     """
     Parallel-Sum circuit class for root-M method.
+
+    The M gates are split into a groups of b gates, a * b >= M, and the inputs of group j are interpolated at node
+    j + 1, so the proof carries b * input_size randoms and a polynomial of degree about a * deg(G).
+    Missing gates of the last group are zero-gates with all-zero inputs.
     """
 
-    def __init__(self, g_gates: List[GGate]):
+    def __init__(self, g_gates: List[GGate], point_count: int = None):
+        """
+        :param point_count: number of groups a, the interpolation points besides node 0; floor(sqrt(M)) by default.
+            It is lowered to the fewest groups of the same size b = ceil(M / a) that hold every gate,
+            since a group of zero-gates only raises the polynomial degree.
+        """
         assert len(g_gates) > 1
 
+        if point_count is None:
+            point_count = math.isqrt(len(g_gates))
+        assert point_count >= 1
+
+        point_count = min(point_count, len(g_gates))
+        g_gates_count = -(-len(g_gates) // point_count)
+        point_count = -(-len(g_gates) // g_gates_count)
+
         self.g_gates: List[GGate] = g_gates
+        self.point_count: int = point_count
+        self.__query_template: Dict[Tuple[int, int], QueryTemplate] = {}
 
     def __call__(self, input: List[Operand]):
         assert len(input) == len(self.g_gates) * self.g_gates[0].get_input_size()
@@ -30,73 +58,153 @@ class ParallelSumRootM:
 
         return sum
 
-    def get_g_gates_count(self):
-        return math.floor(math.sqrt(len(self.g_gates)))
-
-    def make_proof(self, input: List) -> Proof:
-        assert len(input) > 0
-
-        self(input)
+    def get_point_count(self):
+        """
+        Number of groups a; r must be drawn from outside the nodes 0, ..., a
+        """
+        return self.point_count
 
-        randoms: List[Integer] = []
-
-        g_gates_count = math.floor(math.sqrt(len(self.g_gates)))
+    def get_g_gates_count(self):
+        """
+        Number of gates b in each group, which is also the number of G-gates the verifier evaluates
+        """
+        return -(-len(self.g_gates) // self.point_count)
+
+    def is_well_formed(self, proof: Proof) -> bool:
+        """
+        Check the segment layout of a proof received from an untrusted prover before queries are built for it:
+        the inputs of every gate, the randoms of one group, then coefficients
+        """
+        g_gate_input_size = self.g_gates[0].get_input_size()
+        return (len(proof.segments) == 3
+                and proof.segments[0] == (Proof.INPUT, g_gate_input_size * len(self.g_gates))
+                and proof.segments[1] == (Proof.RANDOM, g_gate_input_size * self.get_g_gates_count())
+                and proof.segments[2][0] == Proof.COEFFICIENT)
+
+    def evaluate_g_gates(self, answers: List[List[Integer]]) -> List[Integer]:
+        """
+        Return sum_i G_i(f(r)) for the wire query answers of each of many proofs
+        """
         g_gate_input_size = self.g_gates[0].get_input_size()
 
-        g_gate_input: List[Integer][Integer] = [[Int(0) for _ in range(g_gates_count + 1)] for _ in
-                                                range(g_gate_input_size * g_gates_count)]
-        for i in range(g_gate_input_size * g_gates_count):
-            g_gate_input[i][0] = Int.get_random()
-            randoms.append(g_gate_input[i][0])
-            for j in range(g_gates_count):
-                g_gate_input[i][j + 1] = self.g_gates[(i // g_gate_input_size) + j * g_gates_count].last_input[i % g_gate_input_size]
+        res = [Int.ZERO] * len(answers)
+        for i in range(self.get_g_gates_count()):
+            values = self.g_gates[i].compute_batch(
+                [answer[g_gate_input_size * i:g_gate_input_size * (i + 1)] for answer in answers])
+            res = [a + b for a, b in zip(res, values)]
 
-        interpolated = [Polynomial.interpolate(g_gate_input[i]) for i in range(g_gate_input_size * g_gates_count)]
-        g_gate_poly: Polynomial = self.g_gates[0].compute(interpolated[0:g_gate_input_size])
-        for j in range(1, g_gates_count):
-            g_gate_poly += self.g_gates[j].compute(interpolated[g_gate_input_size * j:g_gate_input_size * (j + 1)])
+        return res
 
-        res = []
-        res.extend(input)
-        res.extend(randoms)
-        res.extend(g_gate_poly.coefficients)
+    def make_proof(self, input: List, workers: int = 1) -> Proof:
+        """
+        :param workers: number of worker processes the gates are sharded across (1 runs in this process)
+        """
+        return Proof.from_segments(self.stream_proof(input, workers))
+
+    def write_proof(self, input: List, sink: BinaryIO, workers: int = 1) -> List[Tuple[str, int]]:
+        """
+        Write the proof segments to sink as they are produced and return the segment layout
+        """
+        return Proof.write_segments(self.stream_proof(input, workers), sink)
+
+    def stream_proof(self, input: List, workers: int = 1) -> Iterator[Tuple[str, FieldVector]]:
+        """
+        Yield the proof segments in order: inputs, randoms, then G-gate polynomial coefficients
+        """
+        assert len(input) == len(self.g_gates) * self.g_gates[0].get_input_size()
 
-        return Proof(res)
+        yield Proof.INPUT, FieldVector.from_integers(input)
 
-    def make_queries(self, proof_size: int, r: Integer) -> List[Query]:
-        g_gates_count = math.floor(math.sqrt(len(self.g_gates)))
+        g_gates_count = self.get_g_gates_count()
         g_gate_input_size = self.g_gates[0].get_input_size() * g_gates_count
-        input_size = g_gate_input_size * g_gates_count
-        coefficient_size = proof_size - input_size - g_gate_input_size
 
-        input_queries = [Query([Int(0) for _ in range(proof_size)]) for _ in range(input_size)]
-        for i in range(input_size):
-            input_queries[i].query[i] = Int(1)
+        # Zero-gates fill the last group; they add G(0) = 0 to the sum
+        with Phase.of(Phase.TRACE):
+            wires = list(input) + [Int.ZERO] * (self.point_count * g_gate_input_size - len(input))
+
+        randoms: List[Integer] = [Int.get_random() for _ in range(g_gate_input_size)]
+        g_gate_input: List[List[Integer]] = [
+            [randoms[i]] + [wires[i + j * g_gate_input_size] for j in range(self.point_count)]
+            for i in range(g_gate_input_size)
+        ]
+
+        yield Proof.RANDOM, FieldVector.from_integers(randoms)
+
+        interpolated, g_gate_poly = ProverPool.compute_g_gate_poly(self.g_gates[:g_gates_count], g_gate_input, workers)
+
+        yield Proof.COEFFICIENT, g_gate_poly.coefficients
+
+    def preprocess(self, proof_size: int) -> QueryTemplate:
+        """
+        Build the r-independent part of the queries once. The result is cached per (prime, proof size).
+        """
+        key = (Int.get_base(), proof_size)
+        if key not in self.__query_template:
+            g_gate_input_size = self.g_gates[0].get_input_size() * self.get_g_gates_count()
+            input_size = self.g_gates[0].get_input_size() * len(self.g_gates)
+
+            # Zero-gate inputs are not in the proof, so their selector is the zero query
+            input_queries = [SparseQuery.unit(proof_size, i) if i < input_size else SparseQuery(proof_size, {})
+                             for i in range(g_gate_input_size * self.point_count)]
+
+            node_queries = []
+            for i in range(g_gate_input_size):
+                g_gate_input = [SparseQuery.unit(proof_size, input_size + i)]
+                for j in range(self.point_count):
+                    g_gate_input.append(input_queries[j * g_gate_input_size + i])
+                node_queries.append(g_gate_input)
+
+            coefficient_start = input_size + g_gate_input_size
+            result_query = PowerQuery(proof_size, coefficient_start, proof_size,
+                                      [(mpz(j), mpz(1)) for j in range(1, self.point_count + 1)])
+
+            self.__query_template[key] = QueryTemplate(proof_size, node_queries, coefficient_start, [result_query])
+
+        return self.__query_template[key]
+
+    def make_queries(self, proof_size: int, r: Integer) -> List[Union[SparseQuery, PowerQuery]]:
+        return self.preprocess(proof_size).make_queries(r)
+
+    def make_transcript(self, input: List, workers: int = 1) -> Transcript:
+        """
+        Make the proof non-interactively; the challenge r is derived from the statement and the proof
+        """
+        result = self(input)
+        return Transcript(result, [self.make_proof(input, workers)])
+
+    def verify_transcript(self, transcript: Transcript) -> bool:
+        return self.verify_transcripts([transcript])[0]
+
+    def verify_transcripts(self, transcripts: List[Transcript]) -> List[bool]:
+        """
+        Verify transcripts made by make_transcript. The G-gate checks of all transcripts are evaluated in one batch.
+        A malformed transcript is rejected without affecting the others.
+        """
+        checked = []
+        for transcript in transcripts:
+            if len(transcript.proofs) != 1 or not self.is_well_formed(transcript.proofs[0]):
+                checked.append(None)
+                continue
+
+            proof = transcript.proofs[0]
+            fiat_shamir = self.__make_fiat_shamir()
+            fiat_shamir.absorb_integer(transcript.result)
+            fiat_shamir.absorb_proof(proof)
+            r = fiat_shamir.challenge(mpz(self.point_count + 1))
+            checked.append((proof, self.make_queries(proof.get_size(), r)))
+
+        g_r = iter(self.evaluate_g_gates([QueryAnswerer.answer(proof, queries[:-2])
+                                          for proof, queries in filter(None, checked)]))
 
         res = []
-        for i in range(g_gate_input_size):
-            g_gate_input = [Query([Int(1) if k == input_size + i else Int(0) for k in range(proof_size)])]
-            for j in range(g_gates_count):
-                g_gate_input.append(input_queries[j * g_gate_input_size + i])
-            res.append(Query.interpolate(g_gate_input, r))
-
-        p_r_query = [Int(0) for _ in range(proof_size)]
-        a = Int(1)
-        for i in range(coefficient_size):
-            p_r_query[input_size + g_gate_input_size + i] = a
-            a *= r
-        res.append(Query(p_r_query))
-
-        result_query = Query([Int(0) for _ in range(proof_size)])
-        for i in range(coefficient_size):
-            result_query.query[input_size + g_gate_input_size + i] = Int(1)
-        for j in range(2, g_gates_count + 1):
-            p_m_query = [Int(0) for _ in range(proof_size)]
-            a = Int(1)
-            for i in range(coefficient_size):
-                p_m_query[input_size + g_gate_input_size + i] = a
-                a *= Int(j)
-            result_query += Query(p_m_query)
-        res.append(result_query)
+        for transcript, entry in zip(transcripts, checked):
+            if entry is None:
+                res.append(False)
+            else:
+                proof, queries = entry
+                res.append(proof * queries[-2] == next(g_r) and proof * queries[-1] == transcript.result)
 
         return res
+
+    def __make_fiat_shamir(self) -> FiatShamir:
+        return FiatShamir(b'ParallelSumRootM', [len(self.g_gates), self.g_gates[0].get_input_size(), self.point_count])
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+from typing import List, Tuple
+
+from gmpy2 import mpz, f_mod
+
+from Base.GGate import GGate
+from Unit.FieldVector import FieldVector
+from Unit.Integer import Integer
+from Unit.Phase import Phase
+from Unit.Polynomial import Polynomial
+from Unit.WorkerPool import WorkerPool
+
+
+class ProverPool:
+    """
+    Opt-in process-pool prover back end.
+    Gates are sharded across worker processes; each worker interpolates the wires of its gates and sums
+    their G-gate polynomials, and the partial sums are reduced into the final G-gate polynomial.
+    With workers <= 1 everything runs in the calling process; otherwise the shared WorkerPool is used.
+    """
+
+    # Number of shards handed to each worker, so that uneven shards still balance out
+    shards_per_worker: int = 4
+
+    @staticmethod
+    def interpolate_all(wires: List[List[Integer]], workers: int = 1) -> List[Polynomial]:
+        if workers <= 1 or len(wires) < 2:
+            with Phase.of(Phase.INTERPOLATE):
+                return Polynomial.interpolate_all(wires)
+
+        shards = ProverPool.__split(len(wires), workers)
+        executor = WorkerPool.get(workers)
+        with Phase.of(Phase.INTERPOLATE):
+            futures = [executor.submit(_interpolate_shard, Integer.get_base(), wires[start:stop])
+                       for start, stop in shards]
+            res = []
+            for future in futures:
+                res.extend(Polynomial(FieldVector(coefficients)) for coefficients in future.result())
+
+        return res
+
+    @staticmethod
+    def compute_g_gate_poly(g_gates: List[GGate], wires: List[List[Integer]],
+                            workers: int = 1) -> Tuple[List[Polynomial], Polynomial]:
+        """
+        Interpolate the wires and return them with sum_j g_gates[j](wires of gate j).
+        Gate j owns the input_size consecutive wires starting at j * input_size.
+        With several workers both steps run inside the workers and are reported as the G_POLY phase.
+        """
+        input_size = g_gates[0].get_input_size()
+        assert len(wires) == len(g_gates) * input_size
+
+        if workers <= 1 or len(g_gates) < 2:
+            with Phase.of(Phase.INTERPOLATE):
+                interpolated = Polynomial.interpolate_all(wires)
+            with Phase.of(Phase.G_POLY):
+                g_gate_poly: Polynomial = g_gates[0].compute(interpolated[0:input_size])
+                for j in range(1, len(g_gates)):
+                    g_gate_poly += g_gates[j].compute(interpolated[input_size * j:input_size * (j + 1)])
+            return interpolated, g_gate_poly
+
+        shards = ProverPool.__split(len(g_gates), workers)
+        executor = WorkerPool.get(workers)
+        with Phase.of(Phase.G_POLY):
+            futures = [
+                executor.submit(_prove_shard, Integer.get_base(), g_gates[start:stop],
+                                wires[start * input_size:stop * input_size])
+                for start, stop in shards
+            ]
+
+            p = Integer.get_base()
+            interpolated = []
+            total = []
+            for future in futures:
+                shard_interpolated, partial = future.result()
+                interpolated.extend(Polynomial(FieldVector(coefficients)) for coefficients in shard_interpolated)
+                if len(partial) > len(total):
+                    total.extend([mpz(0)] * (len(partial) - len(total)))
+                for i, v in enumerate(partial):
+                    total[i] += v
+
+        return interpolated, Polynomial(FieldVector([f_mod(v, p) for v in total]).trim())
+
+    @staticmethod
+    def __split(count: int, workers: int) -> List[Tuple[int, int]]:
+        shard_count = min(count, workers * ProverPool.shards_per_worker)
+        bounds = [count * i // shard_count for i in range(shard_count + 1)]
+        return [(bounds[i], bounds[i + 1]) for i in range(shard_count)]
+
+
+def _use_base(base: mpz):
+    # Setting the prime resets the field caches, so only do it when the prime changed
+    if Integer.get_base() != base:
+        Integer.set_base(base)
+
+
+def _interpolate_shard(base: mpz, wires: List[List[Integer]]) -> List[List[mpz]]:
+    _use_base(base)
+    return [poly.coefficients.values for poly in Polynomial.interpolate_all(wires)]
+
+
+def _prove_shard(base: mpz, g_gates: List[GGate], wires: List[List[Integer]]) -> Tuple[List[List[mpz]], List[mpz]]:
+    _use_base(base)
+    interpolated, g_gate_poly = ProverPool.compute_g_gate_poly(g_gates, wires)
+    return [poly.coefficients.values for poly in interpolated], g_gate_poly.coefficients.values
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from typing import Dict, List, Tuple, Union
+
+from gmpy2 import mpz, f_mod
+
+from Unit.Integer import Integer
+from Unit.PowerQuery import PowerQuery
+from Unit.Query import Query
+from Unit.SparseQuery import SparseQuery
+
+
+class QueryTemplate:
+    """
+    Verifier queries split into an r-independent part computed once per (circuit, proof size)
+    and a cheap per-r combination.
+
+    Each G-gate input wire query is the interpolation at r of the selector queries at the nodes 0, 1, ..., n - 1.
+    The selectors never depend on r, so they are stored per proof index as (node, coefficient) pairs, and
+    make_queries only computes the Lagrange weights at r and their weighted combination.
+    """
+
+    def __init__(self, proof_size: int, node_queries: List[List[Union[Query, SparseQuery, PowerQuery]]],
+                 coefficient_start: int, fixed_queries: List[Union[SparseQuery, PowerQuery]]):
+        """
+        :param node_queries: node_queries[i][k] is the selector query of wire i at node k
+        :param coefficient_start: first proof index of the G-gate polynomial coefficients
+        :param fixed_queries: r-independent queries appended after p(r)
+        """
+        assert len(node_queries) > 0
+
+        self.proof_size = proof_size
+        self.node_count = len(node_queries[0])
+        self.coefficient_start = coefficient_start
+        self.fixed_queries = fixed_queries
+
+        # wires[i][index] lists the (node, coefficient) pairs of proof index in wire i
+        self.wires: List[Dict[int, List[Tuple[int, mpz]]]] = []
+        for nodes in node_queries:
+            assert len(nodes) == self.node_count
+
+            wire: Dict[int, List[Tuple[int, mpz]]] = {}
+            for k, query in enumerate(nodes):
+                for index, coefficient in QueryTemplate.__to_sparse(query).entries.items():
+                    wire.setdefault(index, []).append((k, coefficient))
+            self.wires.append(wire)
+
+    def make_queries(self, r: Integer) -> List[Union[SparseQuery, PowerQuery]]:
+        """
+        Return the wire queries interpolated at r, then p(r), then the fixed queries
+        """
+        p = Integer.get_base()
+        weights = [w.n for w in Query.get_lagrange_weights(self.node_count, r)]
+
+        res = []
+        for wire in self.wires:
+            entries = {}
+            for index, terms in wire.items():
+                value = f_mod(sum((coefficient * weights[k] for k, coefficient in terms), mpz(0)), p)
+                if value != 0:
+                    entries[index] = value
+            res.append(SparseQuery(self.proof_size, entries))
+
+        res.append(PowerQuery.powers(self.proof_size, self.coefficient_start, self.proof_size, r))
+        res.extend(self.fixed_queries)
+
+        return res
+
+    @staticmethod
+    def __to_sparse(query: Union[Query, SparseQuery, PowerQuery]) -> SparseQuery:
+        if isinstance(query, SparseQuery):
+            return query
+        elif isinstance(query, PowerQuery):
+            return query.to_sparse()
+        else:
+            return SparseQuery.from_dense(query)
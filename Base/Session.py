@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
+from typing import List
+
+from gmpy2 import mpz
+
+from Base.ParallelSum import ParallelSum
+from Unit.Integer import Integer
+from Unit.Proof import Proof
+from Unit.QueryAnswerer import QueryAnswerer
+from Unit.Transport import Transport
+from Unit.WireFormat import WireFormat
+
+
+class Prover:
+    """
+    Prover side of an interactive FLIOP session for a ParallelSum circuit.
+
+    Messages, in order:
+        prover -> verifier  proof of round i in the wire format
+        verifier -> prover  challenge r_i as one fixed-width element (every round but the last)
+        verifier -> prover  one-byte verdict after the last round, or in place of a challenge on rejecting early
+
+    Proof generation runs in a thread executor so that many sessions share one event loop. The field caches and
+    the random generator of Integer are thread-safe, so sessions may prove concurrently.
+    Each session needs its own ParallelSum instance, since the circuit keeps the prover state between rounds;
+    for the same reason a process executor cannot be used, as the state would stay in the worker process.
+    """
+
+    def __init__(self, circuit: ParallelSum, inputs: List[Integer], transport: Transport,
+                 executor: Executor = None):
+        """
+        :param executor: thread executor the proofs are computed in (None uses the loop's default executor)
+        """
+        assert not isinstance(executor, ProcessPoolExecutor)
+
+        self.circuit = circuit
+        self.inputs = inputs
+        self.transport = transport
+        self.executor = executor
+
+    async def run(self) -> bool:
+        """
+        Run the session and return the verifier's verdict
+        """
+        loop = asyncio.get_running_loop()
+        max_round = self.circuit.get_max_round()
+
+        r: Integer = None
+        for i in range(max_round):
+            is_final = i == max_round - 1
+            if i == 0:
+                task = partial(self.circuit.make_first_proof, self.inputs, is_final)
+            else:
+                task = partial(self.circuit.make_next_proof, r, is_final)
+            proof: Proof = await loop.run_in_executor(self.executor, task)
+
+            await self.transport.send(WireFormat.dumps(proof))
+            if not is_final:
+                message = await self.transport.recv()
+                if message == b'\x00':
+                    return False
+                r = self.__parse_challenge(message)
+
+        return await self.transport.recv() == b'\x01'
+
+    def __parse_challenge(self, message: bytes) -> Integer:
+        """
+        Decode a challenge, which lies in [fold_factor + 1, p); a verdict byte can never be one
+        """
+        if len(message) != Integer.get_byte_width():
+            raise ValueError(f'challenge of {len(message)} bytes, expected {Integer.get_byte_width()}')
+
+        value = mpz(int.from_bytes(message, 'little'))
+        if not self.circuit.get_fold_factor() + 1 <= value < Integer.get_base():
+            raise ValueError('challenge is not a field element outside the interpolation nodes')
+
+        return Integer.from_reduced(value)
+
+
+class Verifier:
+    """
+    Verifier side of an interactive FLIOP session for a ParallelSum circuit. See Prover for the messages.
+
+    The challenge of a round is sent before that round's proof is checked, so the checks overlap
+    the prover's work on the next round. A proof that cannot be decoded or does not have the layout of its round
+    is rejected at once. The last round checks run in an executor so that they do not block other sessions.
+    """
+
+    def __init__(self, circuit: ParallelSum, result: Integer, transport: Transport, executor: Executor = None):
+        """
+        :param circuit: circuit with the same G-gates as the prover's; only its public structure is used
+        :param result: claimed circuit output
+        :param executor: thread executor the last round checks run in (None uses the loop's default executor)
+        """
+        assert not isinstance(executor, ProcessPoolExecutor)
+
+        self.circuit = circuit
+        self.result = result
+        self.transport = transport
+        self.executor = executor
+
+    async def run(self) -> bool:
+        """
+        Run the session, send the verdict to the prover and return it
+        """
+        loop = asyncio.get_running_loop()
+        max_round = self.circuit.get_max_round()
+
+        is_accepted = True
+        expected = self.result
+        for i in range(max_round):
+            is_final = i == max_round - 1
+            try:
+                proof = WireFormat.loads(await self.transport.recv())
+            except ValueError:
+                proof = None
+            if not isinstance(proof, Proof) or not self.circuit.is_well_formed(proof, is_final):
+                await self.transport.send(b'\x00')
+                return False
+
+            r = Integer.get_random(mpz(self.circuit.get_fold_factor() + 1))
+
+            if not is_final:
+                await self.transport.send(int(r.n).to_bytes(Integer.get_byte_width(), 'little'))
+
+                is_accepted &= proof * self.circuit.make_sum_query(proof.get_size()) == expected
+                expected = proof * ParallelSum.make_p_query(proof.get_size(), r)
+            else:
+                is_accepted &= await loop.run_in_executor(
+                    self.executor, partial(self.__check_last_round, proof, r, expected))
+
+            # Let other sessions run between rounds
+            await asyncio.sleep(0)
+
+        await self.transport.send(b'\x01' if is_accepted else b'\x00')
+
+        return is_accepted
+
+    def __check_last_round(self, proof: Proof, r: Integer, expected: Integer) -> bool:
+        queries = self.circuit.make_last_queries(proof.get_size(), r)
+        validation = QueryAnswerer.answer(proof, queries[:-2])
+        g_r = self.circuit.evaluate_g_gates([validation])[0]
+
+        return proof * queries[-2] == g_r and proof * queries[-1] == expected
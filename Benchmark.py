@@ -0,0 +1,363 @@
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Tuple
+
+import gmpy2
+from gmpy2 import mpz
+
+from Base.ParallelSum import ParallelSum
+from Base.ParallelSumRootM import ParallelSumRootM
+from Custom.ComplexCircuit import ComplexCircuit
+from Custom.InnerProductCircuit import InnerProductCircuit
+from Custom.InnerProductGGate import InnerProductGGate
+from Unit.Integer import Integer
+from Unit.OpCounter import OpCounter
+from Unit.Phase import Phase, PhaseListener
+from Unit.QueryAnswerer import QueryAnswerer
+
+FORMAT_VERSION = 1
+
+# Phases faster than this in the baseline are too noisy to flag as regressions
+NOISE_FLOOR_NS = 50_000
+
+
+class PhaseTimer(PhaseListener):
+    """
+    Accumulate perf_counter_ns per phase. Time inside a nested phase is charged to the innermost phase only.
+    """
+
+    def __init__(self):
+        self.elapsed: Dict[str, int] = {name: 0 for name in Phase.ALL}
+        self.__stack: List[str] = []
+        self.__last = 0
+
+    def enter(self, name: str):
+        now = time.perf_counter_ns()
+        if len(self.__stack) > 0:
+            self.elapsed[self.__stack[-1]] = self.elapsed.get(self.__stack[-1], 0) + now - self.__last
+        self.__stack.append(name)
+        self.__last = now
+
+    def exit(self, name: str):
+        now = time.perf_counter_ns()
+        name = self.__stack.pop()
+        self.elapsed[name] = self.elapsed.get(name, 0) + now - self.__last
+        self.__last = now
+
+
+def run_circuit(circuit, input_vec: List[Integer], workers: int = 1) -> Tuple[bool, int, int]:
+    """
+    One FLPCP run for a Circuit. Return (is_accepted, proof size in bytes, query count).
+    """
+    with Phase.of(Phase.TRACE):
+        calc_result = circuit(input_vec)
+    proof = circuit.make_proof(input_vec, workers)
+
+    with Phase.of(Phase.QUERY_GEN):
+        r = Integer.get_random(mpz(circuit.get_g_gate_count() + 1))
+        queries = circuit.make_queries(len(input_vec), proof.get_size(), r)
+
+    with Phase.of(Phase.ANSWER):
+        answers = QueryAnswerer.answer(proof, queries, workers)
+
+    with Phase.of(Phase.CHECK):
+        g_r = circuit.evaluate_g_gates([answers[:-2]])[0]
+        is_accepted = answers[-2] == g_r and answers[-1] == calc_result
+
+    return is_accepted, proof.get_wire_size(), len(queries)
+
+
+def run_root_m(circuit: ParallelSumRootM, input_vec: List[Integer], workers: int = 1) -> Tuple[bool, int, int]:
+    with Phase.of(Phase.TRACE):
+        calc_result = circuit(input_vec)
+    proof = circuit.make_proof(input_vec, workers)
+
+    with Phase.of(Phase.QUERY_GEN):
+        r = Integer.get_random(mpz(circuit.get_point_count() + 1))
+        queries = circuit.make_queries(proof.get_size(), r)
+
+    with Phase.of(Phase.ANSWER):
+        answers = QueryAnswerer.answer(proof, queries, workers)
+
+    with Phase.of(Phase.CHECK):
+        g_r = circuit.evaluate_g_gates([answers[:-2]])[0]
+        is_accepted = answers[-2] == g_r and answers[-1] == calc_result
+
+    return is_accepted, proof.get_wire_size(), len(queries)
+
+
+def run_parallel_sum(circuit: ParallelSum, input_vec: List[Integer], workers: int = 1) -> Tuple[bool, int, int]:
+    with Phase.of(Phase.TRACE):
+        expected = circuit(input_vec)
+
+    is_accepted = True
+    total_proof_size = 0
+    total_query_count = 0
+
+    r = None
+    for i in range(circuit.get_max_round()):
+        is_final = i == circuit.get_max_round() - 1
+        if i == 0:
+            proof = circuit.make_first_proof(input_vec, is_final, workers)
+        else:
+            proof = circuit.make_next_proof(r, is_final, workers)
+        total_proof_size += proof.get_wire_size()
+
+        with Phase.of(Phase.QUERY_GEN):
+            r = Integer.get_random(mpz(circuit.get_fold_factor() + 1))
+            if is_final:
+                queries = circuit.make_last_queries(proof.get_size(), r)
+            else:
+                queries = [ParallelSum.make_p_query(proof.get_size(), r), circuit.make_sum_query(proof.get_size())]
+        total_query_count += len(queries)
+
+        with Phase.of(Phase.ANSWER):
+            answers = QueryAnswerer.answer(proof, queries, workers)
+
+        with Phase.of(Phase.CHECK):
+            is_accepted &= answers[-1] == expected
+            if is_final:
+                is_accepted &= answers[-2] == circuit.evaluate_g_gates([answers[:-2]])[0]
+            else:
+                expected = answers[0]
+
+    return is_accepted, total_proof_size, total_query_count
+
+
+def make_case(circuit_type: str, dim: int, circuit_count: int, workers: int = 1, fold_factor: int = 2,
+              point_count: int = None) -> Callable[[], Tuple[bool, int, int]]:
+    """
+    Build the circuit and its input once; the returned function runs one prove-and-verify pass.
+    fold_factor applies to parallel_sum and point_count (None for the default) to root_m.
+    """
+    if circuit_type == 'inner_product':
+        circuit = InnerProductCircuit(dim)
+        input_vec = [Integer(i) for i in range(dim * 2)]
+        return lambda: run_circuit(circuit, input_vec, workers)
+    elif circuit_type == 'complex':
+        circuit = ComplexCircuit(dim)
+        input_vec = [Integer(i) for i in range(dim * dim * 8)]
+        return lambda: run_circuit(circuit, input_vec, workers)
+    elif circuit_type == 'parallel_sum':
+        circuit = ParallelSum([InnerProductGGate(dim) for _ in range(circuit_count)], fold_factor)
+        input_vec = [Integer(i) for i in range(dim * 2 * circuit_count)]
+        return lambda: run_parallel_sum(circuit, input_vec, workers)
+    elif circuit_type == 'root_m':
+        circuit = ParallelSumRootM([InnerProductGGate(dim) for _ in range(circuit_count)], point_count)
+        input_vec = [Integer(i) for i in range(dim * 2 * circuit_count)]
+        return lambda: run_root_m(circuit, input_vec, workers)
+    else:
+        assert False
+
+
+CIRCUIT_TYPES = ['inner_product', 'complex', 'parallel_sum', 'root_m']
+
+# Circuits with a fixed number of G-gates are only swept over dim
+SINGLE_CIRCUIT_TYPES = ['inner_product', 'complex']
+
+
+def describe_option(circuit_type: str, fold_factor: int, point_count: int) -> str:
+    return {'parallel_sum': f'k={fold_factor}', 'root_m': f'a={point_count}'}.get(circuit_type, '')
+
+
+def summarize(samples: List[int]) -> Dict[str, float]:
+    return {
+        'median_ns': statistics.median(samples),
+        'min_ns': min(samples),
+        'mean_ns': statistics.mean(samples),
+    }
+
+
+def benchmark_point(circuit_type: str, dim: int, circuit_count: int, warmup: int, repeat: int, seed: int,
+                    count_ops: bool = False, workers: int = 1, fold_factor: int = 2, point_count: int = None) -> Dict:
+    """
+    Time one grid point. Every pass is reseeded, so warmup and repetitions see the same randomness.
+    Cached preprocessing (linear IR, query templates) is built during warmup and reused by the timed passes.
+    With count_ops, one extra untimed pass records the field-operation counts per phase.
+    With several workers the worker pool is started during warmup, and work done inside the workers is
+    timed as part of the phase that dispatched it.
+    """
+    run = make_case(circuit_type, dim, circuit_count, workers, fold_factor, point_count)
+
+    for _ in range(warmup):
+        Integer.set_seed(seed)
+        run()
+
+    samples: Dict[str, List[int]] = {name: [] for name in Phase.ALL + ['total']}
+    is_accepted = True
+    proof_size = query_count = 0
+    for _ in range(repeat):
+        Integer.set_seed(seed)
+        timer = PhaseTimer()
+        Phase.add_listener(timer)
+        try:
+            start = time.perf_counter_ns()
+            accepted, proof_size, query_count = run()
+            total = time.perf_counter_ns() - start
+        finally:
+            Phase.remove_listener(timer)
+
+        is_accepted &= accepted
+        for name in Phase.ALL:
+            samples[name].append(timer.elapsed.get(name, 0))
+        samples['total'].append(total)
+
+    res = {
+        'circuit': circuit_type,
+        'dim': dim,
+        'circuit_count': None if circuit_type in SINGLE_CIRCUIT_TYPES else circuit_count,
+        'fold_factor': fold_factor if circuit_type == 'parallel_sum' else None,
+        'point_count': point_count if circuit_type == 'root_m' else None,
+        'accepted': is_accepted,
+        'proof_size': proof_size,
+        'query_count': query_count,
+        'phases': {name: summarize(values) for name, values in samples.items()},
+    }
+
+    if count_ops:
+        Integer.set_seed(seed)
+        with OpCounter() as counter:
+            run()
+        res['ops'] = counter.report()
+
+    return res
+
+
+def run_grid(circuit_types: List[str], dims: List[int], circuit_counts: List[int], warmup: int, repeat: int,
+             seed: int, count_ops: bool = False, workers: int = 1, fold_factors: List[int] = None,
+             point_counts: List[int] = None) -> List[Dict]:
+    """
+    fold_factors are swept for parallel_sum ([2] by default) and point_counts for root_m (None is floor(sqrt(M)))
+    """
+    fold_factors = fold_factors or [2]
+    point_counts = point_counts or [None]
+
+    results = []
+    for circuit_type in circuit_types:
+        counts = [None] if circuit_type in SINGLE_CIRCUIT_TYPES else circuit_counts
+        if circuit_type == 'parallel_sum':
+            options = [(fold_factor, None) for fold_factor in fold_factors]
+        elif circuit_type == 'root_m':
+            options = [(2, point_count) for point_count in point_counts]
+        else:
+            options = [(2, None)]
+        for dim in dims:
+            for circuit_count in counts:
+                for fold_factor, point_count in options:
+                    result = benchmark_point(circuit_type, dim, circuit_count, warmup, repeat, seed, count_ops,
+                                             workers, fold_factor, point_count)
+                    results.append(result)
+                    option = describe_option(circuit_type, fold_factor, point_count)
+                    print(f'{circuit_type:>14} dim={dim:<3} count={str(circuit_count):<5} {option:<6} '
+                          f'total={result["phases"]["total"]["median_ns"] / 1e6:10.3f} ms  '
+                          f'{"accepted" if result["accepted"] else "REJECTED"}', file=sys.stderr)
+
+    return results
+
+
+def compare(results: List[Dict], baseline: Dict, threshold: float) -> List[Dict]:
+    """
+    Compare median times per phase against a baseline report.
+    A phase regresses when it is slower than the baseline by more than threshold (a fraction).
+    """
+    def key(result: Dict):
+        # Reports written before the grid options existed used the default fold factor and point count
+        fold_factor = result.get('fold_factor', 2 if result['circuit'] == 'parallel_sum' else None)
+        return result['circuit'], result['dim'], result['circuit_count'], fold_factor, result.get('point_count')
+
+    baseline_results = {key(result): result for result in baseline['results']}
+
+    rows = []
+    for result in results:
+        if key(result) not in baseline_results:
+            continue
+        old = baseline_results[key(result)]['phases']
+        for name, stats in result['phases'].items():
+            if name not in old:
+                continue
+            before, after = old[name]['median_ns'], stats['median_ns']
+            ratio = after / before if before > 0 else None
+            rows.append({
+                'circuit': result['circuit'],
+                'dim': result['dim'],
+                'circuit_count': result['circuit_count'],
+                'fold_factor': result.get('fold_factor'),
+                'point_count': result.get('point_count'),
+                'phase': name,
+                'baseline_ns': before,
+                'current_ns': after,
+                'ratio': ratio,
+                'regressed': ratio is not None and before >= NOISE_FLOOR_NS and ratio > 1 + threshold,
+            })
+
+    return rows
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the FLPCP/FLIOP prover and verifier phases')
+    parser.add_argument('--circuits', nargs='+', choices=CIRCUIT_TYPES, default=CIRCUIT_TYPES)
+    parser.add_argument('--dims', nargs='+', type=int, default=[2, 4, 8])
+    parser.add_argument('--counts', nargs='+', type=int, default=[4, 16, 64],
+                        help='circuit counts for parallel-sum circuits (any count; gates are padded as needed)')
+    parser.add_argument('--fold-factors', nargs='+', type=int, default=[2],
+                        help='gate groups folded per round for parallel_sum')
+    parser.add_argument('--point-counts', nargs='+', type=int, default=None,
+                        help='interpolation points for root_m (floor(sqrt(count)) by default)')
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--count-ops', action='store_true', help='also record field-operation counts per phase')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='worker processes for proving and answering (1 runs in this process)')
+    parser.add_argument('--output', help='write the JSON report to this path')
+    parser.add_argument('--baseline', help='JSON report to compare against')
+    parser.add_argument('--threshold', type=float, default=0.1, help='allowed slowdown before flagging a regression')
+    args = parser.parse_args(argv)
+
+    Integer.set_prime(mpz(2) ** 127)
+
+    report = {
+        'version': FORMAT_VERSION,
+        'meta': {
+            'python': platform.python_version(),
+            'gmpy2': gmpy2.version(),
+            'platform': platform.platform(),
+            'prime_bits': Integer.get_base().bit_length(),
+            'seed': args.seed,
+            'warmup': args.warmup,
+            'repeat': args.repeat,
+            'workers': args.workers,
+        },
+        'results': run_grid(args.circuits, args.dims, args.counts, args.warmup, args.repeat, args.seed,
+                            args.count_ops, args.workers, args.fold_factors, args.point_counts),
+    }
+
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline is None:
+        return 0 if all(result['accepted'] for result in report['results']) else 1
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    rows = compare(report['results'], baseline, args.threshold)
+    for row in rows:
+        ratio = f'{row["ratio"]:6.2f}x' if row['ratio'] is not None else '     -'
+        option = describe_option(row['circuit'], row['fold_factor'], row['point_count'])
+        print(f'{row["circuit"]:>14} dim={row["dim"]:<3} count={str(row["circuit_count"]):<5} {option:<6} '
+              f'{row["phase"]:<12}'
+              f'{row["baseline_ns"] / 1e6:10.3f} ms -> {row["current_ns"] / 1e6:10.3f} ms {ratio}'
+              f'{"  REGRESSED" if row["regressed"] else ""}')
+
+    is_regressed = any(row['regressed'] for row in rows)
+    return 1 if is_regressed or not all(result['accepted'] for result in report['results']) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
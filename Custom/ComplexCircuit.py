@@ -1,4 +1,5 @@
 from typing import List
+from Base import Gate
 from Base.Circuit import Circuit
 from Custom.InnerProductGGate import InnerProductGGate
 from Unit.Operand import Operand
@@ -10,10 +11,10 @@ class ComplexCircuit(Circuit):
     """
 
     def __init__(self, dim: int):
-        degrees = compute_degrees(dim)  # Calculate the optimal degrees for the given dimension using dynamic programming
-        # Pass the degrees value when creating InnerProductGGate
         super().__init__(
-            [], [], [InnerProductGGate(dim, degrees) for _ in range(2 * dim + 1)]
+            [Gate.Add() for _ in range(4 * dim * dim)],
+            [Gate.CMul(Integer(i + 2)) for i in range(4 * dim * dim)],
+            [InnerProductGGate(dim) for _ in range(2 * dim + 1)]
         )
         self.dim = dim
 
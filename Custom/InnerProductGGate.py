@@ -1,14 +1,20 @@
 from typing import List
+
+from gmpy2 import mpz
+
 from Base import Gate
 from Base.GGate import GGate
+from Unit.FieldVector import FieldVector
+from Unit.Integer import Integer
 from Unit.Operand import Operand
+from Unit.Polynomial import Polynomial
 
 class InnerProductGGate(GGate):
     """
     Compute the inner product of two n-dimensional vectors
     """
 
-    def __init__(self, dim: int, degrees: List[int]):
+    def __init__(self, dim: int, degrees: List[int] = None):
         assert dim > 1
         self.degrees = degrees  # Store the optimized degrees
 
@@ -22,6 +28,12 @@ class InnerProductGGate(GGate):
         vec0 = input[:len(input) // 2]
         vec1 = input[len(input) // 2:]
 
+        # Fast paths reduce once per result instead of after every add and mul
+        if isinstance(input[0], Polynomial):
+            return Polynomial.inner_product(vec0, vec1)
+        if isinstance(input[0], Integer):
+            return Integer.inner_product(vec0, vec1)
+
         mid = []
 
         for i in range(self.dim):
@@ -32,6 +44,18 @@ class InnerProductGGate(GGate):
             res = self.add[i](res, mid[i + 1])
 
         return res
+
+    # Field elements are unwrapped once for the whole batch and each result is reduced once
+    def compute_batch(self, inputs: List[List[Operand]]):
+        if len(inputs) == 0 or not isinstance(inputs[0][0], Integer):
+            return super().compute_batch(inputs)
+
+        res = []
+        for input in inputs:
+            values: List[mpz] = [v.n for v in input]
+            res.append(Integer.from_reduced(FieldVector.lazy_dot(values[:self.dim], values[self.dim:])))
+
+        return res
     
     # Return the input size of the gate
     def get_input_size(self):
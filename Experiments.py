@@ -1,190 +1,327 @@
+import argparse
+import csv
+import hashlib
+import json
 import os
-
-import matplotlib.pyplot as plt
-
-from TestInnerProdcutParallelSum import test_inner_product_parallel_sum
-from TestInnerProductParallelSumWithoutIOP import test_inner_product_parallel_sum_without_iop
-
-
-def plot_by_circuit_count(count: int):
-    circuit_counts_iop = []
-    prover_times_iop = []
-    verifier_times_iop = []
-    total_proof_sizes_iop = []
-    query_count_iop = []
-
-    for i in range(2, count, 2):
-        circuit_counts_iop.append(2 ** i)
-        _, v, p, t, q = test_inner_product_parallel_sum(dim=2, circuit_count=2 ** i, verbose=True)
-        verifier_times_iop.append(v)
-        prover_times_iop.append(p)
-        total_proof_sizes_iop.append(t)
-        query_count_iop.append(q)
-
-    print(prover_times_iop)
-    print(verifier_times_iop)
-    print(total_proof_sizes_iop)
-    print(query_count_iop)
-
-    circuit_counts = []
-    prover_times = []
-    verifier_times = []
-    total_proof_sizes = []
-    query_count = []
-
-    for i in range(2, count, 2):
-        circuit_counts.append(2 ** i)
-        _, v, p, t, q = test_inner_product_parallel_sum_without_iop(dim=2, circuit_count=2 ** i, verbose=True)
-        verifier_times.append(v)
-        prover_times.append(p)
-        total_proof_sizes.append(t)
-        query_count.append(q)
-
-    print(prover_times)
-    print(verifier_times)
-    print(total_proof_sizes)
-    print(query_count)
-
-    fig, ax = plt.subplots()
-
-    ax.plot(circuit_counts, prover_times, color='blue', marker='^', label='FLPCP')
-    ax.plot(circuit_counts, prover_times_iop, color='red', marker='o', label='FLIOP')
-
-    plt.xlabel('number of circuits')
-    plt.ylabel('prover time(ms)')
-    plt.xscale('log', base=2)
-    plt.xticks(circuit_counts)
-    plt.yscale('log', base=10)
-    plt.legend(fontsize="large")
-
-    fig.savefig(os.path.join('Figure', 'fig_prover_time_by_circuit_count.png'), dpi=300, format='png',
-                facecolor='white',
-                edgecolor='black',
-                orientation='portrait', transparent=False,
-                bbox_inches='tight', pad_inches=0.1, )
-
-    plt.cla()
-
-    ax.plot(circuit_counts, verifier_times, color='blue', marker='^', label='FLPCP')
-    ax.plot(circuit_counts, verifier_times_iop, color='red', marker='o', label='FLIOP')
-
-    plt.xlabel('number of circuits')
-    plt.ylabel('verification time(ms)')
-    plt.xscale('log', base=2)
-    plt.xticks(circuit_counts)
-    plt.yscale('log', base=10)
-    plt.legend(fontsize="large")
-
-    fig.savefig(os.path.join('Figure', 'fig_verification_time_by_circuit_count.png'), dpi=300, format='png', facecolor='white',
-                edgecolor='black', orientation='portrait', transparent=False, bbox_inches='tight', pad_inches=0.1, )
-
-    plt.cla()
-
-    ax.plot(circuit_counts, total_proof_sizes, color='blue', marker='^', label='FLPCP')
-    ax.plot(circuit_counts, total_proof_sizes_iop, color='red', marker='o', label='FLIOP')
-
-    plt.xlabel('number of circuits')
-    plt.ylabel('proof size(bytes)')
-    plt.xscale('log', base=2)
-    plt.xticks(circuit_counts)
-    plt.yscale('log', base=10)
-    plt.legend(fontsize="large")
-
-    fig.savefig(os.path.join('Figure', 'fig_proof_size_by_circuit_count.png'), dpi=300, format='png', facecolor='white',
-                edgecolor='black',
-                orientation='portrait', transparent=False,
-                bbox_inches='tight', pad_inches=0.1, )
-
-
-def plot_by_dim(dim: int):
-    circuit_counts_iop = []
-    prover_times_iop = []
-    verifier_times_iop = []
-    total_proof_sizes_iop = []
-    query_count_iop = []
-
-    for i in range(2, dim):
-        circuit_counts_iop.append(i)
-        _, v, p, t, q = test_inner_product_parallel_sum(dim=i, circuit_count=16, verbose=True)
-        verifier_times_iop.append(v)
-        prover_times_iop.append(p)
-        total_proof_sizes_iop.append(t)
-        query_count_iop.append(q)
-
-    print(prover_times_iop)
-    print(verifier_times_iop)
-    print(total_proof_sizes_iop)
-    print(query_count_iop)
-
-    circuit_counts = []
-    prover_times = []
-    verifier_times = []
-    total_proof_sizes = []
-    query_count = []
-
-    for i in range(2, dim):
-        circuit_counts.append(i)
-        _, v, p, t, q = test_inner_product_parallel_sum_without_iop(dim=i, circuit_count=16, verbose=True)
-        verifier_times.append(v)
-        prover_times.append(p)
-        total_proof_sizes.append(t)
-        query_count.append(q)
-
-    print(prover_times)
-    print(verifier_times)
-    print(total_proof_sizes)
-    print(query_count)
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+# Paths are anchored to this file, so the sweep behaves the same from any working directory
+ROOT = os.path.dirname(os.path.abspath(__file__))
+FIGURE_DIR = os.path.join(ROOT, 'Figure')
+CACHE_DIR = os.path.join(FIGURE_DIR, 'cache')
+
+# Source trees whose contents define the code version of a cached result
+SOURCE_DIRS = ['Base', 'Custom', 'Unit']
+
+# Label and driver of each protocol
+PROTOCOLS = {
+    'FLIOP': 'TestInnerProdcutParallelSum.test_inner_product_parallel_sum',
+    'FLPCP': 'TestInnerProductParallelSumWithoutIOP.test_inner_product_parallel_sum_without_iop',
+}
+
+# Tunable driver argument of each protocol and its default; points at the default leave the argument out
+OPTIONS = {
+    'FLIOP': ('fold_factor', 2),
+    'FLPCP': ('point_count', None),
+}
+
+
+def get_code_version() -> str:
+    """
+    Hash of every source file the experiments run, so that a code change invalidates the cache
+    """
+    paths = [os.path.join(ROOT, module.split('.')[0] + '.py') for module in PROTOCOLS.values()]
+    for directory in SOURCE_DIRS:
+        for dir_path, _, file_names in os.walk(os.path.join(ROOT, directory)):
+            paths.extend(os.path.join(dir_path, name) for name in file_names if name.endswith('.py'))
+
+    digest = hashlib.sha256()
+    for path in sorted(paths):
+        digest.update(os.path.relpath(path, ROOT).encode())
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+
+    return digest.hexdigest()[:16]
+
+
+def get_points(count: int, dim: int, fold_factors: List[int] = None, point_counts: List[int] = None) -> List[Dict]:
+    """
+    The sweep of the paper figures: circuit counts 4, 16, ... below 2^count at dim 2,
+    and dims 2 ... dim - 1 at 16 circuits, once per FLIOP fold factor and per FLPCP point count
+    """
+    values = {'FLIOP': fold_factors or [2], 'FLPCP': point_counts or [None]}
+
+    points = []
+    for protocol in PROTOCOLS:
+        option, default = OPTIONS[protocol]
+        for value in values[protocol]:
+            extra = {} if value == default else {option: value}
+            for i in range(2, count, 2):
+                points.append({'protocol': protocol, 'dim': 2, 'circuit_count': 2 ** i, **extra})
+            for i in range(2, dim):
+                points.append({'protocol': protocol, 'dim': i, 'circuit_count': 16, **extra})
+
+    # The two sweeps share (dim 2, 16 circuits)
+    unique = {json.dumps(point, sort_keys=True): point for point in points}
+    return list(unique.values())
+
+
+def get_cache_path(point: Dict, code_version: str, seed: int) -> str:
+    key = json.dumps({'point': point, 'code_version': code_version, 'seed': seed}, sort_keys=True)
+    return os.path.join(CACHE_DIR, hashlib.sha256(key.encode()).hexdigest()[:24] + '.json')
+
+
+def run_point(point: Dict, seed: int, result_path: str, memory_mb: int = 0):
+    """
+    Entry point of the isolated subprocess: run one configuration and write its result.
+    The memory cap is applied here, before the drivers are imported.
+    """
+    if memory_mb > 0 and os.name == 'posix':
+        limit_memory(memory_mb)
+
+    import importlib
+
+    from Unit.Integer import Integer
+
+    module_name, function_name = PROTOCOLS[point['protocol']].split('.')
+    test = getattr(importlib.import_module(module_name), function_name)
+
+    Integer.set_seed(seed)
+    option, _ = OPTIONS[point['protocol']]
+    kwargs = {option: point[option]} if option in point else {}
+    is_accepted, verifier_time, prover_time, proof_size, query_count = test(
+        dim=point['dim'], circuit_count=point['circuit_count'], verbose=False, **kwargs)
+
+    with open(result_path, 'w') as f:
+        json.dump({
+            'accepted': bool(is_accepted),
+            'verifier_time_ms': verifier_time,
+            'prover_time_ms': prover_time,
+            'proof_size': proof_size,
+            'query_count': query_count,
+        }, f)
+
+
+def limit_memory(memory_mb: int):
+    import resource
+
+    limit = memory_mb * 2 ** 20
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def execute_point(point: Dict, code_version: str, seed: int, timeout: float, memory_mb: int) -> Dict:
+    """
+    Run one point in a fresh interpreter under a timeout and an address-space cap, and cache the outcome
+    """
+    entry = {'point': point, 'code_version': code_version, 'seed': seed}
+
+    with tempfile.TemporaryDirectory() as directory:
+        result_path = os.path.join(directory, 'result.json')
+        # The cap is set by the child itself: preexec_fn is unsafe while the sweep's threads are running
+        command = [sys.executable, os.path.abspath(__file__), 'point', json.dumps(point), result_path,
+                   '--seed', str(seed), '--memory-mb', str(memory_mb)]
+        try:
+            completed = subprocess.run(command, cwd=ROOT, timeout=timeout,
+                                       stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+            if completed.returncode == 0:
+                with open(result_path) as f:
+                    entry.update(status='ok', result=json.load(f))
+            else:
+                error = completed.stderr.decode(errors='replace').strip().splitlines()
+                entry.update(status='error', error=error[-1] if len(error) > 0 else f'exit {completed.returncode}')
+        except subprocess.TimeoutExpired:
+            entry.update(status='timeout', error=f'timed out after {timeout} s')
+
+    # Write through a temporary file so that an interrupted sweep never leaves a partial entry
+    path = get_cache_path(point, code_version, seed)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(entry, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+    return entry
+
+
+def run_sweep(points: List[Dict], seed: int, jobs: int, timeout: float, memory_mb: int,
+              retry_failed: bool = False) -> List[Dict]:
+    """
+    Run every point that has no cached result for the current code version, jobs at a time
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    code_version = get_code_version()
+
+    pending = []
+    for point in points:
+        path = get_cache_path(point, code_version, seed)
+        if os.path.exists(path):
+            with open(path) as f:
+                if not retry_failed or json.load(f)['status'] == 'ok':
+                    continue
+        pending.append(point)
+
+    print(f'{len(points) - len(pending)} of {len(points)} points cached, running {len(pending)}', file=sys.stderr)
+
+    # Each point runs in its own subprocess, so threads are enough to keep jobs of them busy
+    entries = []
+    with ThreadPoolExecutor(max_workers=max(jobs, 1)) as executor:
+        futures = [executor.submit(execute_point, point, code_version, seed, timeout, memory_mb) for point in pending]
+        for future in futures:
+            entry = future.result()
+            entries.append(entry)
+            print(f'{entry["point"]}: {entry["status"]}', file=sys.stderr)
+
+    return entries
+
+
+def load_cache(code_version: str = None) -> List[Dict]:
+    """
+    Return the cached entries, only those of code_version if it is given
+    """
+    if not os.path.exists(CACHE_DIR):
+        return []
+
+    entries = []
+    for name in sorted(os.listdir(CACHE_DIR)):
+        if name.endswith('.json'):
+            with open(os.path.join(CACHE_DIR, name)) as f:
+                entry = json.load(f)
+            if code_version is None or entry['code_version'] == code_version:
+                entries.append(entry)
+
+    return entries
+
+
+def export_csv(entries: List[Dict], path: str):
+    fields = ['protocol', 'fold_factor', 'point_count', 'dim', 'circuit_count', 'status', 'accepted',
+              'verifier_time_ms', 'prover_time_ms', 'proof_size', 'query_count', 'seed', 'code_version']
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        for entry in entries:
+            row = dict(entry['point'], status=entry['status'], seed=entry['seed'], code_version=entry['code_version'])
+            row.update(entry.get('result', {}))
+            writer.writerow(row)
+
+
+def get_series(point: Dict) -> str:
+    """
+    Plot label of a point: its protocol, with the tunable option if it is not the default
+    """
+    option, _ = OPTIONS[point['protocol']]
+    if option not in point:
+        return point['protocol']
+    return f'{point["protocol"]} ({option}={point[option]})'
+
+
+def select(entries: List[Dict], series: str, key: str, fixed: Tuple[str, int]) -> Tuple[List[int], List[Dict]]:
+    """
+    Successful results of one series with fixed[0] == fixed[1], sorted by key
+    """
+    rows = sorted(((entry['point'][key], entry['result']) for entry in entries
+                   if entry['status'] == 'ok' and get_series(entry['point']) == series
+                   and entry['point'][fixed[0]] == fixed[1]), key=lambda row: row[0])
+    return [x for x, _ in rows], [result for _, result in rows]
+
+
+def save_figure(entries: List[Dict], key: str, fixed: Tuple[str, int], metric: str, x_label: str, y_label: str,
+                file_name: str, log_scale: bool):
+    import matplotlib.pyplot as plt
 
     fig, ax = plt.subplots()
-
-    ax.plot(circuit_counts, prover_times, color='blue', marker='^', label='FLPCP')
-    ax.plot(circuit_counts, prover_times_iop, color='red', marker='o', label='FLIOP')
-
-    plt.xlabel('input vector dimension')
-    plt.ylabel('prover time(ms)')
-    plt.xticks(circuit_counts)
+    ticks = []
+    for series in sorted({get_series(entry['point']) for entry in entries}):
+        # The default series keep the colors of the paper figures
+        style = {'FLPCP': {'color': 'blue', 'marker': '^'}, 'FLIOP': {'color': 'red', 'marker': 'o'}}.get(
+            series, {'marker': 'o' if series.startswith('FLIOP') else '^', 'linestyle': '--'})
+        xs, results = select(entries, series, key, fixed)
+        ax.plot(xs, [result[metric] for result in results], label=series, **style)
+        ticks = sorted(set(ticks) | set(xs))
+
+    plt.xlabel(x_label)
+    plt.ylabel(y_label)
+    if log_scale:
+        plt.xscale('log', base=2)
+        plt.yscale('log', base=10)
+    plt.xticks(ticks)
     plt.legend(fontsize="large")
 
-    fig.savefig(os.path.join('Figure', 'fig_prover_time_by_dim.png'), dpi=300, format='png',
-                facecolor='white',
-                edgecolor='black',
-                orientation='portrait', transparent=False,
-                bbox_inches='tight', pad_inches=0.1, )
-
-    plt.cla()
-
-    ax.plot(circuit_counts, verifier_times, color='blue', marker='^', label='FLPCP')
-    ax.plot(circuit_counts, verifier_times_iop, color='red', marker='o', label='FLIOP')
-
-    plt.xlabel('input vector dimension')
-    plt.ylabel('verification time(ms)')
-    plt.xticks(circuit_counts)
-    plt.legend(fontsize="large")
-
-    fig.savefig(os.path.join('Figure', 'fig_verification_time_by_dim.png'), dpi=300, format='png', facecolor='white',
-                edgecolor='black',
-                orientation='portrait', transparent=False,
-                bbox_inches='tight', pad_inches=0.1, )
-
-    plt.cla()
-
-    ax.plot(circuit_counts, total_proof_sizes, color='blue', marker='^', label='FLPCP')
-    ax.plot(circuit_counts, total_proof_sizes_iop, color='red', marker='o', label='FLIOP')
-
-    plt.xlabel('input vector dimension')
-    plt.ylabel('proof size(bytes)')
-    plt.xticks(circuit_counts)
-    plt.legend(fontsize="large")
-
-    fig.savefig(os.path.join('Figure', 'fig_proof_size_by_dim.png'), dpi=300, format='png', facecolor='white',
-                edgecolor='black',
-                orientation='portrait', transparent=False,
-                bbox_inches='tight', pad_inches=0.1)
+    fig.savefig(os.path.join(FIGURE_DIR, file_name), dpi=300, format='png', facecolor='white', edgecolor='black',
+                orientation='portrait', transparent=False, bbox_inches='tight', pad_inches=0.1)
+    plt.close(fig)
+
+
+def plot_by_circuit_count(entries: List[Dict]):
+    for metric, y_label, name in [('prover_time_ms', 'prover time(ms)', 'prover_time'),
+                                  ('verifier_time_ms', 'verification time(ms)', 'verification_time'),
+                                  ('proof_size', 'proof size(bytes)', 'proof_size')]:
+        save_figure(entries, 'circuit_count', ('dim', 2), metric, 'number of circuits', y_label,
+                    f'fig_{name}_by_circuit_count.png', True)
+
+
+def plot_by_dim(entries: List[Dict]):
+    for metric, y_label, name in [('prover_time_ms', 'prover time(ms)', 'prover_time'),
+                                  ('verifier_time_ms', 'verification time(ms)', 'verification_time'),
+                                  ('proof_size', 'proof size(bytes)', 'proof_size')]:
+        save_figure(entries, 'dim', ('circuit_count', 16), metric, 'input vector dimension', y_label,
+                    f'fig_{name}_by_dim.png', False)
+
+
+def plot(any_version: bool = False):
+    """
+    Redraw every figure from the cache alone
+    """
+    entries = load_cache(None if any_version else get_code_version())
+    export_csv(entries, os.path.join(FIGURE_DIR, 'results.csv'))
+    plot_by_circuit_count(entries)
+    plot_by_dim(entries)
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description='Run the FLPCP/FLIOP sweeps and draw the figures from the cache')
+    commands = parser.add_subparsers(dest='command')
+
+    run_parser = commands.add_parser('run', help='run the missing sweep points, then plot')
+    run_parser.add_argument('--count', type=int, default=11, help='circuit counts go up to 2^(count - 1)')
+    run_parser.add_argument('--dim', type=int, default=12, help='dims go up to dim - 1')
+    run_parser.add_argument('--fold-factors', nargs='+', type=int, default=[2],
+                            help='FLIOP gate groups folded per round')
+    run_parser.add_argument('--point-counts', nargs='+', type=int, default=None,
+                            help='FLPCP interpolation points (floor(sqrt(count)) by default)')
+    run_parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1)
+    run_parser.add_argument('--timeout', type=float, default=3600, help='seconds per point')
+    run_parser.add_argument('--memory-mb', type=int, default=0, help='address-space cap per point (0 for none)')
+    run_parser.add_argument('--seed', type=int, default=0)
+    run_parser.add_argument('--retry-failed', action='store_true', help='rerun cached timeouts and errors')
+    run_parser.add_argument('--no-plot', action='store_true')
+
+    plot_parser = commands.add_parser('plot', help='draw the figures from the cache only')
+    plot_parser.add_argument('--any-version', action='store_true', help='also use results of other code versions')
+
+    point_parser = commands.add_parser('point', help=argparse.SUPPRESS)
+    point_parser.add_argument('point')
+    point_parser.add_argument('result_path')
+    point_parser.add_argument('--seed', type=int, default=0)
+    point_parser.add_argument('--memory-mb', type=int, default=0)
+
+    args = parser.parse_args(argv)
+
+    os.makedirs(FIGURE_DIR, exist_ok=True)
+
+    if args.command == 'point':
+        run_point(json.loads(args.point), args.seed, args.result_path, args.memory_mb)
+    elif args.command == 'plot':
+        plot(args.any_version)
+    else:
+        if args.command is None:
+            args = run_parser.parse_args([])
+        run_sweep(get_points(args.count, args.dim, args.fold_factors, args.point_counts), args.seed, args.jobs,
+                  args.timeout, args.memory_mb, args.retry_failed)
+        if not args.no_plot:
+            plot()
 
 
 if __name__ == '__main__':
-    if not os.path.exists('Figure'):
-        os.makedirs('Figure')
-
-    plot_by_circuit_count(count=11)
-    plot_by_dim(dim=12)
+    main()
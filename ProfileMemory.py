@@ -0,0 +1,113 @@
+import argparse
+import json
+import sys
+from typing import Dict, List
+
+from gmpy2 import mpz
+
+from Base.ParallelSum import ParallelSum
+from Base.ParallelSumRootM import ParallelSumRootM
+from Custom.InnerProductGGate import InnerProductGGate
+from Unit.Integer import Integer
+from Unit.MemoryProfiler import MemoryProfiler
+from Unit.QueryAnswerer import QueryAnswerer
+
+
+def profile_parallel_sum(profiler: MemoryProfiler, dim: int, circuit_count: int) -> bool:
+    circuit = ParallelSum([InnerProductGGate(dim) for _ in range(circuit_count)])
+    input_vec = [Integer(i) for i in range(dim * 2 * circuit_count)]
+    expected = circuit(input_vec)
+
+    is_accepted = True
+    r = None
+    for i in range(circuit.get_max_round()):
+        is_final = i == circuit.get_max_round() - 1
+        if i == 0:
+            with profiler.section('make_first_proof'):
+                proof = circuit.make_first_proof(input_vec, is_final)
+        else:
+            with profiler.section(f'make_next_proof[{i}]'):
+                proof = circuit.make_next_proof(r, is_final)
+
+        r = Integer.get_random(mpz(circuit.get_fold_factor() + 1))
+        if is_final:
+            with profiler.section('make_last_queries'):
+                queries = circuit.make_last_queries(proof.get_size(), r)
+        else:
+            queries = [ParallelSum.make_p_query(proof.get_size(), r), circuit.make_sum_query(proof.get_size())]
+
+        with profiler.section(f'answer[{i}]'):
+            answers = QueryAnswerer.answer(proof, queries)
+
+        is_accepted &= answers[-1] == expected
+        if is_final:
+            is_accepted &= answers[-2] == circuit.evaluate_g_gates([answers[:-2]])[0]
+        else:
+            expected = answers[0]
+
+    return is_accepted
+
+
+def profile_root_m(profiler: MemoryProfiler, dim: int, circuit_count: int) -> bool:
+    circuit = ParallelSumRootM([InnerProductGGate(dim) for _ in range(circuit_count)])
+    input_vec = [Integer(i) for i in range(dim * 2 * circuit_count)]
+    calc_result = circuit(input_vec)
+
+    with profiler.section('make_proof'):
+        proof = circuit.make_proof(input_vec)
+
+    r = Integer.get_random(mpz(circuit.get_point_count() + 1))
+    with profiler.section('make_queries'):
+        queries = circuit.make_queries(proof.get_size(), r)
+
+    with profiler.section('answer'):
+        answers = QueryAnswerer.answer(proof, queries)
+
+    return answers[-2] == circuit.evaluate_g_gates([answers[:-2]])[0] and answers[-1] == calc_result
+
+
+def print_sections(title: str, sections: List[Dict]):
+    print(title)
+    for section in sections:
+        objects = ', '.join(f'{name}={count}' for name, count in section['live_objects'].items() if count > 0)
+        print(f'  {section["name"]:<20} traced peak {section["traced_peak_growth_bytes"] / 2 ** 20:9.2f} MiB  '
+              f'net {section["traced_net_bytes"] / 2 ** 20:9.2f} MiB  rss peak {section["rss_peak_bytes"] / 2 ** 20:9.2f} MiB')
+        print(f'  {"":<20} live: {objects}')
+        for site in section['top_sites'][:3]:
+            print(f'  {"":<20} {site["size_bytes"] / 2 ** 10:10.1f} KiB {site["count"]:>8} blocks  {site["site"]}')
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='Profile memory per protocol section')
+    parser.add_argument('--circuits', nargs='+', choices=['parallel_sum', 'root_m'], default=['parallel_sum', 'root_m'])
+    parser.add_argument('--dim', type=int, default=2)
+    parser.add_argument('--count', type=int, default=256)
+    parser.add_argument('--top', type=int, default=10, help='allocation sites reported per section')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the JSON report to this path')
+    args = parser.parse_args(argv)
+
+    Integer.set_prime(mpz(2) ** 127)
+
+    report = {'dim': args.dim, 'circuit_count': args.count, 'circuits': {}}
+    is_accepted = True
+    for circuit_type in args.circuits:
+        Integer.set_seed(args.seed)
+        with MemoryProfiler(top=args.top) as profiler:
+            if circuit_type == 'parallel_sum':
+                is_accepted &= profile_parallel_sum(profiler, args.dim, args.count)
+            else:
+                is_accepted &= profile_root_m(profiler, args.dim, args.count)
+
+        report['circuits'][circuit_type] = profiler.report()
+        print_sections(f'{circuit_type} (dim={args.dim}, count={args.count})', profiler.sections)
+
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    return 0 if is_accepted else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
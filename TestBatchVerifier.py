@@ -0,0 +1,59 @@
+from datetime import datetime
+
+from gmpy2 import mpz
+
+from Base.BatchVerifier import BatchVerifier
+from Base.ParallelSumRootM import ParallelSumRootM
+from Custom.InnerProductGGate import InnerProductGGate
+from Unit.Integer import Integer
+from Unit.Proof import Proof
+
+
+def test_batch_verifier(dim: int, circuit_count: int, proof_count: int, verbose: bool = True):
+    Integer.set_prime(mpz(2) ** 127)
+
+    my_circuit = ParallelSumRootM([InnerProductGGate(dim=dim) for _ in range(circuit_count)])
+
+    proofs = []
+    results = []
+    for k in range(proof_count):
+        input_vec = [Integer(i + k) for i in range(dim * 2 * circuit_count)]
+        results.append(my_circuit(input_vec))
+        proofs.append(my_circuit.make_proof(input_vec))
+
+    # Warm up the query template cache so that only verification is timed
+    BatchVerifier.make_queries(my_circuit, proofs[0].get_size())
+
+    start = datetime.now()
+    accepted = BatchVerifier.verify(my_circuit, proofs, results)
+    end = datetime.now()
+    verifier_time = (end - start).total_seconds()
+
+    # Tamper with one proof; only that proof must be rejected
+    tampered = proofs[0].proof.copy()
+    tampered[-1] = tampered[-1] + Integer(1)
+    rejected = BatchVerifier.verify(my_circuit, [Proof(tampered)] + proofs[1:], results)
+
+    if verbose:
+        print('-------------------------------------------')
+        print(f'Circuit: perform inner product of two {dim}-dim vector (x {circuit_count}), {proof_count} proofs')
+        print('Accepted!' if all(accepted) else 'Rejected!')
+        print('Tampered proof isolated: ', rejected == [False] + [True] * (proof_count - 1))
+        print('Verifier elapsed time(ms): ', verifier_time * 1000)
+        print('Verifier throughput(proofs/s): ', proof_count / verifier_time)
+        print('-------------------------------------------')
+
+    assert all(accepted)
+    assert rejected == [False] + [True] * (proof_count - 1)
+
+    return accepted, verifier_time * 1000
+
+
+if __name__ == '__main__':
+    print('/-----------------------------------------\\')
+    print('|    Simple Fully Linear PCP Simulator    |')
+    print('|   Batch verification of many proofs     |')
+    print('\\-----------------------------------------/')
+    print('')
+
+    test_batch_verifier(dim=3, circuit_count=64, proof_count=32)
@@ -3,6 +3,7 @@ from gmpy2 import mpz
 from Custom.ComplexCircuit import ComplexCircuit
 from Custom.InnerProductGGate import InnerProductGGate
 from Unit.Integer import Integer
+from Unit.QueryAnswerer import QueryAnswerer
 
 if __name__ == '__main__':
     print('/-----------------------------------------\\')
@@ -44,9 +45,7 @@ if __name__ == '__main__':
     print('Queries: ', queries)
 
     # Perform dot product between proof and queries (P -> V)
-    validation = []
-    for i in range(len(queries) - 2):
-        validation.append(proof * queries[i])
+    validation = QueryAnswerer.answer(proof, queries[:-2])
 
     # Verification (V)
     g_gate = InnerProductGGate(dim)
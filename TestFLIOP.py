@@ -3,6 +3,7 @@ from gmpy2 import mpz
 from Base.ParallelSumRootM import ParallelSumRootM
 from Custom.InnerProductGGate import InnerProductGGate
 from Unit.Integer import Integer
+from Unit.QueryAnswerer import QueryAnswerer
 
 # Improved function to compute optimal degrees
 def compute_degrees(n: int):
@@ -25,7 +26,7 @@ def compute_degrees(n: int):
     return degrees
 
 # Function to test FLIOP
-def test_fliop(dim: int, circuit_count: int, verbose: bool = True):
+def test_fliop(dim: int, circuit_count: int, verbose: bool = True, workers: int = 1):
     # Set the base prime number
     Integer.set_prime(mpz(2) ** 127)
 
@@ -46,17 +47,17 @@ def test_fliop(dim: int, circuit_count: int, verbose: bool = True):
     # Measure the time taken by the prover to compute the circuit and generate the proof
     start = datetime.now()
     calc_result = my_circuit(input_vec)
-    proof = my_circuit.make_proof(input_vec)
+    proof = my_circuit.make_proof(input_vec, workers)
     end = datetime.now()
     prover_time += (end - start).total_seconds()
     # print("Proof Vector:", proof)
 
     # Calculate proof length in bytes
-    proof_length = proof.get_byte_size()
+    proof_length = proof.get_wire_size()
 
     # Measure the time taken by the verifier to generate queries
     start = datetime.now()
-    r = Integer.get_random(mpz(my_circuit.get_g_gates_count() + 1))
+    r = Integer.get_random(mpz(my_circuit.get_point_count() + 1))
     queries = my_circuit.make_queries(proof.get_size(), r)
     end = datetime.now()
     verifier_time += (end - start).total_seconds()
@@ -67,9 +68,7 @@ def test_fliop(dim: int, circuit_count: int, verbose: bool = True):
 
     # Measure the time taken to compute the inner product of proof vector and query vector
     start = datetime.now()
-    validation = []
-    for i in range(len(queries) - 2):
-        validation.append(proof * queries[i])
+    validation = QueryAnswerer.answer(proof, queries[:-2], workers)
     end = datetime.now()
     prover_time += (end - start).total_seconds()
     print("Validation Results:", validation)
@@ -87,7 +86,7 @@ def test_fliop(dim: int, circuit_count: int, verbose: bool = True):
     start = datetime.now()
     is_accepted = proof * queries[-2] == g_r and proof * queries[-1] == calc_result
     end = datetime.now()
-    prover_time += (end - start).total_seconds()
+    verifier_time += (end - start).total_seconds()
 
     # Print the results
     if verbose:
@@ -99,7 +98,7 @@ def test_fliop(dim: int, circuit_count: int, verbose: bool = True):
         print('Proof length (bytes): ', proof_length)
         print('Query complexity: ', query_complexity)
         print('Soundness error: ', (proof.get_size() - 1 - len(input_vec) - my_circuit.get_g_gates_count()) / (
-                    Integer.get_base() - my_circuit.get_g_gates_count()))
+                    Integer.get_base() - my_circuit.get_point_count()))
         print('-------------------------------------------')
 
     # Assert that the verification result is correct
@@ -116,3 +115,6 @@ if __name__ == '__main__':
 
     # Perform test with example parameters
     test_fliop(dim=2, circuit_count=4)
+
+    # Prove and answer the queries across 2 worker processes
+    test_fliop(dim=2, circuit_count=4, workers=2)
@@ -0,0 +1,77 @@
+from datetime import datetime
+
+from gmpy2 import mpz
+
+from Base.ParallelSum import ParallelSum
+from Base.ParallelSumRootM import ParallelSumRootM
+from Custom.InnerProductGGate import InnerProductGGate
+from Unit.Integer import Integer
+from Unit.Proof import Proof
+from Unit.Transcript import Transcript
+
+
+def test_fiat_shamir(dim: int, circuit_count: int, transcript_count: int, verbose: bool = True):
+    Integer.set_prime(mpz(2) ** 127)
+
+    input_size = dim * 2 * circuit_count
+    inputs = [[Integer(i + k) for i in range(input_size)] for k in range(transcript_count)]
+
+    parallel_circuit = ParallelSum([InnerProductGGate(dim=dim) for _ in range(circuit_count)])
+    root_m_circuit = ParallelSumRootM([InnerProductGGate(dim=dim) for _ in range(circuit_count)])
+
+    start = datetime.now()
+    parallel_transcripts = [parallel_circuit.make_transcript(input_vec).to_bytes() for input_vec in inputs]
+    root_m_transcripts = [root_m_circuit.make_transcript(input_vec).to_bytes() for input_vec in inputs]
+    end = datetime.now()
+    prover_time = (end - start).total_seconds()
+
+    # Transcripts are verified offline from their encoded form only
+    start = datetime.now()
+    parallel_accepted = parallel_circuit.verify_transcripts(
+        [Transcript.from_bytes(encoded) for encoded in parallel_transcripts], input_size)
+    root_m_accepted = root_m_circuit.verify_transcripts(
+        [Transcript.from_bytes(encoded) for encoded in root_m_transcripts])
+    end = datetime.now()
+    verifier_time = (end - start).total_seconds()
+
+    # A transcript claiming another result must be rejected
+    forged = Transcript.from_bytes(parallel_transcripts[0])
+    forged.result = forged.result + Integer(1)
+    is_forgery_rejected = not parallel_circuit.verify_transcript(forged, input_size)
+
+    # A truncated proof is rejected without aborting the rest of the batch
+    truncated = Transcript.from_bytes(parallel_transcripts[0])
+    truncated.proofs[-1] = Proof(truncated.proofs[-1].proof[:3])
+    is_forgery_rejected &= parallel_circuit.verify_transcripts(
+        [truncated, Transcript.from_bytes(parallel_transcripts[0])], input_size) == [False, True]
+    truncated = Transcript.from_bytes(root_m_transcripts[0])
+    truncated.proofs[0] = Proof(truncated.proofs[0].proof[:3])
+    is_forgery_rejected &= root_m_circuit.verify_transcripts(
+        [truncated, Transcript.from_bytes(root_m_transcripts[0])]) == [False, True]
+
+    is_accepted = all(parallel_accepted) and all(root_m_accepted)
+
+    if verbose:
+        print('-------------------------------------------')
+        print(f'Circuit: perform inner product of two {dim}-dim vector (x {circuit_count}), {transcript_count} transcripts')
+        print('Accepted!' if is_accepted else 'Rejected!')
+        print('Forged transcript rejected: ', is_forgery_rejected)
+        print('Verifier elapsed time(ms): ', verifier_time * 1000)
+        print('Prover elapsed time(ms): ', prover_time * 1000)
+        print('Parallel-sum transcript length: ', len(parallel_transcripts[0]))
+        print('Root-M transcript length: ', len(root_m_transcripts[0]))
+        print('-------------------------------------------')
+
+    assert is_accepted and is_forgery_rejected
+
+    return is_accepted, verifier_time * 1000, prover_time * 1000
+
+
+if __name__ == '__main__':
+    print('/-----------------------------------------------\\')
+    print('|       Simple Fully Linear IOP Simulator       |')
+    print('|   Non-interactive proofs with Fiat-Shamir     |')
+    print('\\-----------------------------------------------/')
+    print('')
+
+    test_fiat_shamir(dim=3, circuit_count=64, transcript_count=8)
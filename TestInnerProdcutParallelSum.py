@@ -6,22 +6,27 @@ from gmpy2.gmpy2 import mpz
 from Base.ParallelSum import ParallelSum
 from Custom.InnerProductGGate import InnerProductGGate
 from Unit.Integer import Integer
+from Unit.QueryAnswerer import QueryAnswerer
 
 
-def test_inner_product_parallel_sum(dim: int, circuit_count: int, verbose: bool = True):
+def test_inner_product_parallel_sum(dim: int, circuit_count: int, verbose: bool = True, fold_factor: int = 2,
+                                    workers: int = 1):
     """
     Test inner product parallel-sum circuit with recursive linear IOP
 
     :param dim: each circuit perform inner product with two dimension-dim vectors
     :param circuit_count: the number of inner product circuit
     :param verbose: whether printing information or not
+    :param fold_factor: number of gate groups combined per round
+    :param workers: number of worker processes for proving and answering queries (1 runs in this process)
     :return: tuple(is_accepted, verifier_time, prover_time, total_proof_size, query_count)
     """
 
     Integer.set_prime(mpz(2) ** 127)
     input_vec = [Integer(i) for i in range(dim * 2 * circuit_count)]
 
-    parallel_circuit: ParallelSum = ParallelSum([InnerProductGGate(dim=dim) for _ in range(circuit_count)])
+    parallel_circuit: ParallelSum = ParallelSum([InnerProductGGate(dim=dim) for _ in range(circuit_count)],
+                                                    fold_factor)
 
     prover_time = 0
     verifier_time = 0
@@ -35,36 +40,34 @@ def test_inner_product_parallel_sum(dim: int, circuit_count: int, verbose: bool
 
     if parallel_circuit.get_max_round() == 1:
         start = datetime.now()
-        proof = parallel_circuit.make_first_proof(input_vec, True)
+        proof = parallel_circuit.make_first_proof(input_vec, True, workers)
         end = datetime.now()
         prover_time += (end - start).total_seconds()
 
         start = datetime.now()
-        r = Integer.get_random(mpz(3))
+        r = Integer.get_random(mpz(fold_factor + 1))
         queries = parallel_circuit.make_last_queries(proof.get_size(), r)
         end = datetime.now()
         verifier_time += (end - start).total_seconds()
 
         start = datetime.now()
-        validation = []
-        for i in range(len(queries) - 3):
-            validation.append(proof * queries[i])
+        validation = QueryAnswerer.answer(proof, queries[:-2], workers)
         end = datetime.now()
         prover_time += (end - start).total_seconds()
 
         start = datetime.now()
-        g_gate = [InnerProductGGate(dim) for _ in range(circuit_count // 2)]
+        g_gate = [InnerProductGGate(dim) for _ in range(len(validation) // parallel_circuit.get_g_gate_input_size())]
         g_r = Integer(0)
-        for i in range(circuit_count // 2):
+        for i in range(len(validation) // parallel_circuit.get_g_gate_input_size()):
             g_r += g_gate[i](validation[i * (g_gate[0].get_input_size()): (i + 1) * (g_gate[0].get_input_size())])
         end = datetime.now()
         verifier_time += (end - start).total_seconds()
 
         start = datetime.now()
-        is_accepted &= (proof * queries[-3] == g_r)
-        is_accepted &= (proof * queries[-1] + proof * queries[-2] == calc_result)
+        is_accepted &= (proof * queries[-2] == g_r)
+        is_accepted &= (proof * queries[-1] == calc_result)
         end = datetime.now()
-        prover_time += (end - start).total_seconds()
+        verifier_time += (end - start).total_seconds()
 
         if verbose:
             print('-------------------------------------------')
@@ -86,68 +89,64 @@ def test_inner_product_parallel_sum(dim: int, circuit_count: int, verbose: bool
         total_query_length = 0
 
         start = datetime.now()
-        proof = parallel_circuit.make_first_proof(input_vec)
+        proof = parallel_circuit.make_first_proof(input_vec, workers=workers)
         end = datetime.now()
         prover_time += (end - start).total_seconds()
-        total_proof_length += proof.get_byte_size()
+        total_proof_length += proof.get_wire_size()
 
         start = datetime.now()
-        r = Integer.get_random(mpz(3))
-        query_at_one = ParallelSum.make_p_query(proof.get_size(), Integer(1))
-        query_at_two = ParallelSum.make_p_query(proof.get_size(), Integer(2))
+        r = Integer.get_random(mpz(fold_factor + 1))
+        query_at_nodes = parallel_circuit.make_sum_query(proof.get_size())
         query_at_r = ParallelSum.make_p_query(proof.get_size(), r)
         end = datetime.now()
         verifier_time += (end - start).total_seconds()
 
         start = datetime.now()
         p_r = proof * query_at_r
-        is_accepted &= (proof * query_at_one + proof * query_at_two == calc_result)
+        is_accepted &= (proof * query_at_nodes == calc_result)
         end = datetime.now()
         prover_time += (end - start).total_seconds()
-        total_proof_length += proof.get_byte_size()
+        total_proof_length += proof.get_wire_size()
 
-        total_query_length += 3
+        total_query_length += 2
 
         for i in range(1, parallel_circuit.get_max_round() - 1):
             start = datetime.now()
-            proof = parallel_circuit.make_next_proof(r)
+            proof = parallel_circuit.make_next_proof(r, workers=workers)
             end = datetime.now()
             prover_time += (end - start).total_seconds()
-            total_proof_length += proof.get_byte_size()
+            total_proof_length += proof.get_wire_size()
 
             start = datetime.now()
-            r = Integer.get_random(mpz(3))
-            query_at_one = ParallelSum.make_p_query(proof.get_size(), Integer(1))
-            query_at_two = ParallelSum.make_p_query(proof.get_size(), Integer(2))
+            r = Integer.get_random(mpz(fold_factor + 1))
+            query_at_nodes = parallel_circuit.make_sum_query(proof.get_size())
             query_at_r = ParallelSum.make_p_query(proof.get_size(), r)
             end = datetime.now()
             verifier_time += (end - start).total_seconds()
 
             start = datetime.now()
-            is_accepted &= (proof * query_at_one + proof * query_at_two == p_r)
+            is_accepted &= (proof * query_at_nodes == p_r)
             p_r = proof * query_at_r
             end = datetime.now()
             prover_time += (end - start).total_seconds()
 
-            total_query_length += 3
+            total_query_length += 2
 
         start = datetime.now()
-        proof = parallel_circuit.make_next_proof(r, True)
+        proof = parallel_circuit.make_next_proof(r, True, workers)
         end = datetime.now()
         prover_time += (end - start).total_seconds()
-        total_proof_length += proof.get_byte_size()
+        total_proof_length += proof.get_wire_size()
 
         start = datetime.now()
-        r = Integer.get_random(mpz(3))
+        r = Integer.get_random(mpz(fold_factor + 1))
         queries = parallel_circuit.make_last_queries(proof.get_size(), r)
         end = datetime.now()
         verifier_time += (end - start).total_seconds()
         total_query_length += len(queries)
 
         start = datetime.now()
-        validation = []
-        for i in range(len(queries) - 3):
-            validation.append(proof * queries[i])
+        validation = QueryAnswerer.answer(proof, queries[:-2], workers)
         end = datetime.now()
         prover_time += (end - start).total_seconds()
 
@@ -160,10 +159,10 @@ def test_inner_product_parallel_sum(dim: int, circuit_count: int, verbose: bool
         verifier_time += (end - start).total_seconds()
 
         start = datetime.now()
-        is_accepted &= (proof * queries[-3] == g_r)
-        is_accepted &= (proof * queries[-1] + proof * queries[-2] == p_r)
+        is_accepted &= (proof * queries[-2] == g_r)
+        is_accepted &= (proof * queries[-1] == p_r)
         end = datetime.now()
-        prover_time += (end - start).total_seconds()
+        verifier_time += (end - start).total_seconds()
 
         if verbose:
             print('-------------------------------------------')
@@ -181,6 +180,62 @@ def test_inner_product_parallel_sum(dim: int, circuit_count: int, verbose: bool
         return is_accepted, verifier_time * 1000, prover_time * 1000, total_proof_length, total_query_length
 
 
+def test_parallel_prover(dim: int, circuit_count: int, workers: int = 2, verbose: bool = True):
+    """
+    Check that proofs made across worker processes equal the serial proofs made with the same randomness
+
+    :param workers: number of prover worker processes
+    :return: tuple(is_equal, serial prover_time, parallel prover_time)
+    """
+
+    Integer.set_prime(mpz(2) ** 127)
+    input_vec = [Integer(i) for i in range(dim * 2 * circuit_count)]
+
+    serial_circuit = ParallelSum([InnerProductGGate(dim=dim) for _ in range(circuit_count)])
+    parallel_circuit = ParallelSum([InnerProductGGate(dim=dim) for _ in range(circuit_count)])
+
+    serial_time = 0
+    parallel_time = 0
+    is_equal = True
+
+    r = None
+    for i in range(serial_circuit.get_max_round()):
+        is_final = i == serial_circuit.get_max_round() - 1
+
+        Integer.set_seed(i)
+        start = datetime.now()
+        if i == 0:
+            serial_proof = serial_circuit.make_first_proof(input_vec, is_final)
+        else:
+            serial_proof = serial_circuit.make_next_proof(r, is_final)
+        end = datetime.now()
+        serial_time += (end - start).total_seconds()
+
+        Integer.set_seed(i)
+        start = datetime.now()
+        if i == 0:
+            parallel_proof = parallel_circuit.make_first_proof(input_vec, is_final, workers)
+        else:
+            parallel_proof = parallel_circuit.make_next_proof(r, is_final, workers)
+        end = datetime.now()
+        parallel_time += (end - start).total_seconds()
+
+        is_equal &= list(serial_proof.proof.values) == list(parallel_proof.proof.values)
+        r = Integer.get_random(mpz(3))
+
+    if verbose:
+        print('-------------------------------------------')
+        print(f'Circuit: perform inner product of two {dim}-dim vector (x {circuit_count}), {workers} workers')
+        print('Parallel proofs equal serial proofs!' if is_equal else 'Parallel proofs differ!')
+        print('Serial prover elapsed time(ms): ', serial_time * 1000)
+        print('Parallel prover elapsed time(ms): ', parallel_time * 1000)
+        print('-------------------------------------------')
+
+    assert is_equal
+
+    return is_equal, serial_time * 1000, parallel_time * 1000
+
+
 if __name__ == '__main__':
     print('/-----------------------------------------------\\')
     print('|       Simple Fully Linear IOP Simulator       |')
@@ -189,3 +244,6 @@ if __name__ == '__main__':
     print('')
 
     test_inner_product_parallel_sum(dim=3, circuit_count=1024)
+    test_inner_product_parallel_sum(dim=3, circuit_count=1000, fold_factor=4)
+    test_parallel_prover(dim=3, circuit_count=1024)
+    test_inner_product_parallel_sum(dim=3, circuit_count=1024, workers=2)
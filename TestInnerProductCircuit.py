@@ -3,6 +3,7 @@ from gmpy2 import mpz
 from Custom.InnerProductCircuit import InnerProductCircuit
 from Custom.InnerProductGGate import InnerProductGGate
 from Unit.Integer import Integer
+from Unit.QueryAnswerer import QueryAnswerer
 
 if __name__ == '__main__':
     print('/-------------------------------------------\\')
@@ -43,9 +44,7 @@ if __name__ == '__main__':
     queries = my_circuit.make_queries(len(input_vec), proof.get_size(), r)
 
     # Perform dot product between proof and queries (P -> V)
-    validation = []
-    for i in range(len(queries) - 2):
-        validation.append(proof * queries[i])
+    validation = QueryAnswerer.answer(proof, queries[:-2])
 
     # Verification (V)
     g_gate = InnerProductGGate(dim)
@@ -5,34 +5,38 @@ from gmpy2 import mpz
 from Base.ParallelSumRootM import ParallelSumRootM
 from Custom.InnerProductGGate import InnerProductGGate
 from Unit.Integer import Integer
+from Unit.QueryAnswerer import QueryAnswerer
 
 
-def test_inner_product_parallel_sum_without_iop(dim: int, circuit_count: int, verbose: bool = True):
+def test_inner_product_parallel_sum_without_iop(dim: int, circuit_count: int, verbose: bool = True,
+                                                point_count: int = None, workers: int = 1):
+    """
+    :param point_count: number of gate groups interpolated in the proof, floor(sqrt(circuit_count)) by default
+    :param workers: number of worker processes for proving and answering queries (1 runs in this process)
+    """
     Integer.set_prime(mpz(2) ** 127)
 
     input_vec = [Integer(i) for i in range(dim * 2 * circuit_count)]
 
-    my_circuit = ParallelSumRootM([InnerProductGGate(dim=dim) for _ in range(circuit_count)])
+    my_circuit = ParallelSumRootM([InnerProductGGate(dim=dim) for _ in range(circuit_count)], point_count)
 
     prover_time = 0
     verifier_time = 0
 
     start = datetime.now()
     calc_result = my_circuit(input_vec)
-    proof = my_circuit.make_proof(input_vec)
+    proof = my_circuit.make_proof(input_vec, workers)
     end = datetime.now()
     prover_time += (end - start).total_seconds()
 
     start = datetime.now()
-    r = Integer.get_random(mpz(my_circuit.get_g_gates_count() + 1))
+    r = Integer.get_random(mpz(my_circuit.get_point_count() + 1))
     queries = my_circuit.make_queries(proof.get_size(), r)
     end = datetime.now()
     verifier_time += (end - start).total_seconds()
 
     start = datetime.now()
-    validation = []
-    for i in range(len(queries) - 2):
-        validation.append(proof * queries[i])
+    validation = QueryAnswerer.answer(proof, queries[:-2], workers)
     end = datetime.now()
     prover_time += (end - start).total_seconds()
 
@@ -47,7 +51,7 @@ def test_inner_product_parallel_sum_without_iop(dim: int, circuit_count: int, ve
     start = datetime.now()
     is_accepted = proof * queries[-2] == g_r and proof * queries[-1] == calc_result
     end = datetime.now()
-    prover_time += (end - start).total_seconds()
+    verifier_time += (end - start).total_seconds()
 
     if verbose:
         print('-------------------------------------------')
@@ -58,12 +62,12 @@ def test_inner_product_parallel_sum_without_iop(dim: int, circuit_count: int, ve
         print('Proof length: ', proof.get_size())
         print('Query complexity: ', len(queries))
         print('Soundness error: ', (proof.get_size() - 1 - len(input_vec) - my_circuit.get_g_gates_count()) / (
-                    Integer.get_base() - my_circuit.get_g_gates_count()))
+                    Integer.get_base() - my_circuit.get_point_count()))
         print('-------------------------------------------')
 
     assert is_accepted
 
-    return is_accepted, verifier_time * 1000, prover_time * 1000, proof.get_byte_size(), len(queries)
+    return is_accepted, verifier_time * 1000, prover_time * 1000, proof.get_wire_size(), len(queries)
 
 
 if __name__ == '__main__':
@@ -74,3 +78,5 @@ if __name__ == '__main__':
     print('')
 
     test_inner_product_parallel_sum_without_iop(dim=3, circuit_count=64)
+    test_inner_product_parallel_sum_without_iop(dim=3, circuit_count=100, point_count=4)
+    test_inner_product_parallel_sum_without_iop(dim=3, circuit_count=64, workers=2)
@@ -0,0 +1,87 @@
+import asyncio
+from datetime import datetime
+from typing import List
+
+from gmpy2 import mpz
+
+from Base.ParallelSum import ParallelSum
+from Base.Session import Prover, Verifier
+from Custom.InnerProductGGate import InnerProductGGate
+from Unit.Integer import Integer
+from Unit.Transport import MemoryTransport, TcpTransport
+
+
+async def run_memory_sessions(dim: int, circuit_count: int, session_count: int) -> List:
+    sessions = []
+    for k in range(session_count):
+        input_vec = [Integer(i + k) for i in range(dim * 2 * circuit_count)]
+        prover_circuit = ParallelSum([InnerProductGGate(dim=dim) for _ in range(circuit_count)])
+        verifier_circuit = ParallelSum([InnerProductGGate(dim=dim) for _ in range(circuit_count)])
+        prover_end, verifier_end = MemoryTransport.pair()
+
+        sessions.append(Prover(prover_circuit, input_vec, prover_end).run())
+        sessions.append(Verifier(verifier_circuit, prover_circuit(input_vec), verifier_end).run())
+
+    return await asyncio.gather(*sessions)
+
+
+async def run_tcp_sessions(dim: int, circuit_count: int, session_count: int) -> List:
+    async def verify(transport: TcpTransport):
+        # The first message of a session is the claimed result
+        result = Integer(int.from_bytes(await transport.recv(), 'little'))
+        verifier_circuit = ParallelSum([InnerProductGGate(dim=dim) for _ in range(circuit_count)])
+        await Verifier(verifier_circuit, result, transport).run()
+
+    async def prove(k: int) -> bool:
+        input_vec = [Integer(i + k) for i in range(dim * 2 * circuit_count)]
+        prover_circuit = ParallelSum([InnerProductGGate(dim=dim) for _ in range(circuit_count)])
+
+        transport = await TcpTransport.connect(host, port)
+        try:
+            await transport.send(int(prover_circuit(input_vec).n).to_bytes(Integer.get_byte_width(), 'little'))
+            return await Prover(prover_circuit, input_vec, transport).run()
+        finally:
+            await transport.close()
+
+    server = await TcpTransport.serve(verify)
+    host, port = server.sockets[0].getsockname()[:2]
+    async with server:
+        return await asyncio.gather(*[prove(k) for k in range(session_count)])
+
+
+def test_interactive_parallel_sum(dim: int, circuit_count: int, session_count: int, verbose: bool = True):
+    Integer.set_prime(mpz(2) ** 127)
+
+    start = datetime.now()
+    memory_accepted = asyncio.run(run_memory_sessions(dim, circuit_count, session_count))
+    end = datetime.now()
+    memory_time = (end - start).total_seconds()
+
+    start = datetime.now()
+    tcp_accepted = asyncio.run(run_tcp_sessions(dim, circuit_count, session_count))
+    end = datetime.now()
+    tcp_time = (end - start).total_seconds()
+
+    is_accepted = all(memory_accepted) and all(tcp_accepted)
+
+    if verbose:
+        print('-------------------------------------------')
+        print(f'Circuit: perform inner product of two {dim}-dim vector (x {circuit_count}), {session_count} sessions')
+        print('Accepted!' if is_accepted else 'Rejected!')
+        print('In-memory sessions elapsed time(ms): ', memory_time * 1000)
+        print('TCP sessions elapsed time(ms): ', tcp_time * 1000)
+        print('-------------------------------------------')
+
+    assert is_accepted
+
+    return is_accepted, memory_time * 1000, tcp_time * 1000
+
+
+if __name__ == '__main__':
+    print('/-----------------------------------------------\\')
+    print('|       Simple Fully Linear IOP Simulator       |')
+    print('|   Concurrent interactive parallel-sum FLIOP   |')
+    print('\\-----------------------------------------------/')
+    print('')
+
+    test_interactive_parallel_sum(dim=3, circuit_count=64, session_count=16)
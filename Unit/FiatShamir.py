@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import hashlib
+from typing import List
+
+from gmpy2 import mpz
+
+from Unit.Integer import Integer
+from Unit.Proof import Proof
+from Unit.WireFormat import WireFormat
+
+
+class FiatShamir:
+    """
+    SHA-256 hash chain that replaces the verifier's random challenges.
+    It absorbs the public statement and then every proof in wire format, and each challenge is derived
+    from everything absorbed so far. Prover and verifier must absorb the same data in the same order.
+    """
+
+    def __init__(self, label: bytes, statement: List[int]):
+        """
+        :param label: protocol name, so that challenges of different protocols never coincide
+        :param statement: public circuit parameters bound into every challenge
+        """
+        self.state = hashlib.sha256()
+        self.__absorb(label)
+        self.__absorb(int(Integer.get_base()).to_bytes(Integer.get_byte_width(), 'little'))
+        for v in statement:
+            self.__absorb(int(v).to_bytes(8, 'little'))
+
+    def absorb_integer(self, value: Integer):
+        self.__absorb(int(value.n).to_bytes(Integer.get_byte_width(), 'little'))
+
+    def absorb_proof(self, proof: Proof):
+        self.__absorb(WireFormat.dumps(proof))
+
+    def challenge(self, min: mpz = mpz(0)) -> Integer:
+        """
+        Derive a challenge in [min, p). 512 hash bits are reduced, so the bias is negligible for primes below 2^256.
+        """
+        p = Integer.get_base()
+        seed = self.state.digest()
+        wide = hashlib.sha256(seed + b'\x00').digest() + hashlib.sha256(seed + b'\x01').digest()
+        res = Integer.from_reduced(mpz(int.from_bytes(wide, 'little')) % (p - min) + min)
+
+        # Chain the challenge so that consecutive challenges differ
+        self.absorb_integer(res)
+
+        return res
+
+    def __absorb(self, data: bytes):
+        self.state.update(len(data).to_bytes(8, 'little'))
+        self.state.update(data)
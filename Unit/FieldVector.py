@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import sys
+from operator import mul
+from collections import abc
+from typing import Iterable, Iterator, List, Union
+
+from gmpy2 import mpz, f_mod
+
+from Unit.Integer import Integer
+
+
+class FieldView(abc.Sequence):
+    """
+    Read-only zero-copy view over fixed-width little-endian field elements in a buffer.
+    Elements are decoded on access.
+    """
+
+    __slots__ = ('buffer', 'width')
+
+    def __init__(self, buffer: memoryview, width: int):
+        assert len(buffer) % width == 0
+
+        self.buffer = buffer
+        self.width = width
+
+    def __len__(self) -> int:
+        return len(self.buffer) // self.width
+
+    def __getitem__(self, item: Union[int, slice]) -> Union[mpz, List[mpz]]:
+        if isinstance(item, slice):
+            return [self[i] for i in range(*item.indices(len(self)))]
+        if item < 0:
+            item += len(self)
+        if not 0 <= item < len(self):
+            raise IndexError('FieldView index out of range')
+        return mpz(int.from_bytes(self.buffer[item * self.width:(item + 1) * self.width], 'little'))
+
+    def __iter__(self) -> Iterator[mpz]:
+        width = self.width
+        buffer = self.buffer
+        for i in range(0, len(buffer), width):
+            yield mpz(int.from_bytes(buffer[i:i + width], 'little'))
+
+
+class FieldVector:
+    """
+    Vector of field elements stored as raw reduced mpz values.
+    Bulk operations work on the raw values so that no Integer wrapper is created per element.
+    """
+
+    __slots__ = ('values',)
+
+    def __init__(self, values: Iterable[mpz]):
+        self.values: Union[List[mpz], FieldView] = list(values)
+
+    @staticmethod
+    def view(buffer: memoryview, width: int) -> FieldVector:
+        """
+        Wrap a buffer of fixed-width elements without copying it. The result is read-only.
+        """
+        res = object.__new__(FieldVector)
+        res.values = FieldView(buffer, width)
+        return res
+
+    @staticmethod
+    def zeros(size: int) -> FieldVector:
+        return FieldVector([mpz(0)] * size)
+
+    @staticmethod
+    def from_integers(integers: Iterable[Integer]) -> FieldVector:
+        return FieldVector([i.n for i in integers])
+
+    def to_integers(self) -> List[Integer]:
+        return [Integer.from_reduced(v) for v in self.values]
+
+    def __repr__(self) -> str:
+        return str([int(v) for v in self.values])
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __iter__(self) -> Iterator[Integer]:
+        return iter(self.to_integers())
+
+    def __getitem__(self, item: Union[int, slice]) -> Union[Integer, FieldVector]:
+        if isinstance(item, slice):
+            return FieldVector(self.values[item])
+        return Integer.from_reduced(self.values[item])
+
+    def __setitem__(self, key: int, value: Integer):
+        self.values[key] = value.n
+
+    def copy(self) -> FieldVector:
+        return FieldVector(self.values)
+
+    def add(self, other: FieldVector) -> FieldVector:
+        assert len(self.values) == len(other.values)
+
+        p = Integer.get_base()
+        return FieldVector([f_mod(a + b, p) for a, b in zip(self.values, other.values)])
+
+    def sub(self, other: FieldVector) -> FieldVector:
+        assert len(self.values) == len(other.values)
+
+        p = Integer.get_base()
+        return FieldVector([f_mod(a - b, p) for a, b in zip(self.values, other.values)])
+
+    def scale(self, c: mpz) -> FieldVector:
+        p = Integer.get_base()
+        return FieldVector([f_mod(a * c, p) for a in self.values])
+
+    def axpy(self, a: mpz, x: FieldVector):
+        """
+        In-place self <- self + a * x
+        """
+        assert len(self.values) == len(x.values)
+
+        p = Integer.get_base()
+        values = self.values
+        for i, v in enumerate(x.values):
+            values[i] = f_mod(values[i] + a * v, p)
+
+    def dot(self, other: FieldVector) -> mpz:
+        assert len(self.values) == len(other.values)
+
+        return FieldVector.lazy_dot(self.values, other.values)
+
+    @staticmethod
+    def lazy_dot(xs: Iterable[mpz], ys: Iterable[mpz]) -> mpz:
+        """
+        Sum the unreduced products and reduce once at the end
+        """
+        return f_mod(sum(map(mul, xs, ys), mpz(0)), Integer.get_base())
+
+    def trim(self) -> FieldVector:
+        """
+        Remove trailing zero elements in place
+        """
+        values = self.values
+        while len(values) > 0 and values[-1] == 0:
+            values.pop()
+
+        return self
+
+    def to_bytes(self, width: int) -> bytes:
+        """
+        Encode as consecutive little-endian integers of width bytes each
+        """
+        if isinstance(self.values, FieldView) and self.values.width == width:
+            return bytes(self.values.buffer)
+        return b''.join(int(v).to_bytes(width, 'little') for v in self.values)
+
+    @staticmethod
+    def from_bytes(buffer: Union[bytes, memoryview], width: int) -> FieldVector:
+        assert len(buffer) % width == 0
+
+        return FieldVector([mpz(int.from_bytes(buffer[i:i + width], 'little')) for i in range(0, len(buffer), width)])
+
+    def get_byte_size(self) -> int:
+        return sum(sys.getsizeof(v) for v in self.values)
@@ -1,62 +1,214 @@
 from __future__ import annotations
 
 import sys
+import threading
 import time
-from typing import Union
-from gmpy2 import mpz, c_mod, mpz_random, random_state, cmp, next_prime, powmod, invert
+from typing import Dict, List, Union
+from gmpy2 import mpz, c_mod, mpz_random, random_state, cmp, next_prime, powmod, invert, is_prime, legendre, bit_scan1
 
 from Unit.Operand import Operand
 
 
 class Integer(Operand):
+    __slots__ = ('n',)
+
     __base: mpz = mpz(2)
     __random_state = random_state(int(time.time()))
+    __random_lock = threading.Lock()
+    __inverse_table: List[mpz] = [mpz(0), mpz(1)]
+    __node_weights: Dict[int, List[mpz]] = {}
+    __root_of_unity: Union[mpz, None] = None
+    # Serializes updates of the field caches; readers use the published tables without locking
+    __cache_lock = threading.Lock()
 
     @staticmethod
     def set_base(base: Union[mpz, int]):
         assert type(base) is int or type(base) is mpz
 
         Integer.__base = -mpz(base)
+        Integer.__reset_field_cache()
 
     @staticmethod
     def get_base() -> mpz:
         return -Integer.__base
 
+    @staticmethod
+    def get_byte_width() -> int:
+        """
+        Number of bytes of a fixed-width encoding of one field element
+        """
+        return (Integer.get_base().bit_length() + 7) // 8
+
+    @staticmethod
+    def set_seed(seed: int):
+        """
+        Reseed the generator behind get_random, for reproducible runs
+        """
+        with Integer.__random_lock:
+            Integer.__random_state = random_state(seed)
+
     @staticmethod
     def get_random(min: mpz = mpz(0)) -> Integer:
-        return Integer(mpz_random(Integer.__random_state, Integer.__base - min) + min)
+        # The generator state is shared by every thread, e.g. concurrent prover sessions
+        with Integer.__random_lock:
+            n = mpz_random(Integer.__random_state, Integer.__base - min)
+        return Integer(n + min)
+
+    @staticmethod
+    def set_prime(min: mpz, ntt_friendly: bool = False, two_adicity: int = 64):
+        """
+        Choose the smallest (probable) prime at least min.
+        If ntt_friendly is set, choose the smallest prime p = c * 2^two_adicity + 1 at least min instead,
+        so that p - 1 is divisible by 2^two_adicity.
+        """
+        if ntt_friendly:
+            step = mpz(2) ** two_adicity
+            c = max((mpz(min) - 1 + step - 1) // step, 1)
+            while not is_prime(c * step + 1):
+                c += 1
+            Integer.__base = -(c * step + 1)
+        else:
+            Integer.__base = -next_prime(min)
+        Integer.__reset_field_cache()
 
     @staticmethod
-    def set_prime(min: mpz):
-        Integer.__base = -next_prime(min)
+    def __reset_field_cache():
+        with Integer.__cache_lock:
+            Integer.__inverse_table = [mpz(0), mpz(1)]
+            Integer.__node_weights = {}
+            Integer.__root_of_unity = None
+
+    @staticmethod
+    def get_two_adicity() -> int:
+        """
+        Return the largest s such that 2^s divides p - 1
+        """
+        return bit_scan1(Integer.get_base() - 1)
+
+    @staticmethod
+    def get_root_of_unity(order: int) -> mpz:
+        """
+        Return a primitive root of unity of the given power-of-two order
+        """
+        s = Integer.get_two_adicity()
+        assert order > 0 and order & (order - 1) == 0 and order <= 2 ** s
+
+        p = Integer.get_base()
+        if Integer.__root_of_unity is None:
+            # z^((p - 1) / 2^s) has order exactly 2^s for any quadratic non-residue z
+            z = mpz(2)
+            while legendre(z, p) != -1:
+                z += 1
+            Integer.__root_of_unity = powmod(z, (p - 1) >> s, p)
+
+        return powmod(Integer.__root_of_unity, (2 ** s) // order, p)
+
+    @staticmethod
+    def get_small_inverse(k: int) -> Integer:
+        """
+        Return k^-1 from the inverse table of small integers, extending the table up to k if needed
+        """
+        assert 0 < k < Integer.get_base()
+
+        return Integer.from_reduced(Integer.__get_inverse_table(k)[k])
+
+    @staticmethod
+    def __get_inverse_table(k: int) -> List[mpz]:
+        """
+        Return an inverse table holding at least 0, ..., k. A published table is never mutated:
+        an extension is built privately and replaces the table in one assignment.
+        """
+        table = Integer.__inverse_table
+        if k < len(table):
+            return table
+
+        with Integer.__cache_lock:
+            table = list(Integer.__inverse_table)
+            p = Integer.get_base()
+            for i in range(len(table), k + 1):
+                # i^-1 = -(p // i) * (p mod i)^-1
+                table.append(c_mod(-(p // i) * table[p % i], Integer.__base))
+            if len(table) > len(Integer.__inverse_table):
+                Integer.__inverse_table = table
+
+        return table
+
+    @staticmethod
+    def get_node_weights(n: int) -> List[mpz]:
+        """
+        Return the barycentric weights 1 / prod_{k != j} (j - k) of the nodes 0, 1, ..., n - 1
+        """
+        assert n > 0
+
+        weights = Integer.__node_weights.get(n)
+        if weights is None:
+            table = Integer.__get_inverse_table(max(n - 1, 1))
+
+            # inverse_factorial[i] = (i!)^-1
+            inverse_factorial = [mpz(1)]
+            for i in range(1, n):
+                inverse_factorial.append(c_mod(inverse_factorial[-1] * table[i], Integer.__base))
+
+            weights = [
+                c_mod(inverse_factorial[j] * inverse_factorial[n - 1 - j] * (-1) ** (n - 1 - j), Integer.__base)
+                for j in range(n)
+            ]
+            with Integer.__cache_lock:
+                Integer.__node_weights = {**Integer.__node_weights, n: weights}
+
+        return weights
 
     def __init__(self, n: Union[mpz, int]):
-        super().__init__()
         assert type(n) is int or type(n) is mpz
 
         self.n: mpz = c_mod(n, Integer.__base)
 
+    @staticmethod
+    def from_reduced(n: mpz) -> Integer:
+        """
+        Trusted constructor for a value already reduced into [0, p)
+        """
+        res = object.__new__(Integer)
+        res.n = n
+        return res
+
+    @staticmethod
+    def inner_product(vec0: List[Integer], vec1: List[Integer]) -> Integer:
+        """
+        sum_i vec0[i] * vec1[i] with a single modular reduction
+        """
+        assert len(vec0) == len(vec1)
+
+        res = mpz(0)
+        for a, b in zip(vec0, vec1):
+            res += a.n * b.n
+
+        return Integer(res)
+
     def invert(self):
-        return Integer(invert(self.n, Integer.get_base()))
+        return Integer.from_reduced(invert(self.n, Integer.get_base()))
 
     def __repr__(self):
         return str(self.n)
 
     def __add__(self, other: Integer) -> Integer:
-        return Integer(c_mod(self.n + other.n, Integer.__base))
+        return Integer.from_reduced(c_mod(self.n + other.n, Integer.__base))
 
     def __sub__(self, other: Integer) -> Integer:
-        return Integer(c_mod(self.n - other.n, Integer.__base))
+        return Integer.from_reduced(c_mod(self.n - other.n, Integer.__base))
 
     def __mul__(self, other: Integer) -> Integer:
-        return Integer(c_mod(self.n * other.n, Integer.__base))
+        return Integer.from_reduced(c_mod(self.n * other.n, Integer.__base))
 
     def __pow__(self, other: Integer) -> Integer:
-        return Integer(powmod(self.n, other.n, Integer.__base))
+        return Integer.from_reduced(c_mod(powmod(self.n, other.n, Integer.__base), Integer.__base))
 
     def __eq__(self, other: Integer) -> bool:
         return cmp(self.n, other.n) == 0
 
+    def __hash__(self):
+        return hash(self.n)
+
     def __gt__(self, other):
         return cmp(self.n, other.n) > 0
 
@@ -74,3 +226,8 @@ class Integer(Operand):
 
     def get_size(self) -> int:
         return sys.getsizeof(self.n)
+
+
+# Interned constants shared by every caller; Integer values are never mutated in place
+Integer.ZERO = Integer.from_reduced(mpz(0))
+Integer.ONE = Integer.from_reduced(mpz(1))
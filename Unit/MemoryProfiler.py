@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import gc
+import json
+import os
+import sys
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Union
+
+from Unit.FieldVector import FieldVector
+from Unit.Integer import Integer
+from Unit.Polynomial import Polynomial
+from Unit.PowerQuery import PowerQuery
+from Unit.Proof import Proof
+from Unit.Query import Query
+from Unit.SparseQuery import SparseQuery
+
+
+class MemoryProfiler:
+    """
+    Memory profile of named protocol sections, built on tracemalloc and RSS sampling.
+
+        with MemoryProfiler() as profiler:
+            with profiler.section('make_first_proof'):
+                proof = circuit.make_first_proof(input_vec)
+        print(profiler.to_json())
+
+    For every section it records the traced peak, the net traced growth, the RSS at entry and exit and the
+    highest sampled RSS, the live object counts of the field and query classes at exit, and the top allocation
+    sites by net growth. Sections should not be nested. Tracing slows the code down several times,
+    so profile runs are for sizing memory, not for timing.
+    """
+
+    # Classes whose live instances are counted at the end of every section
+    tracked_classes = [Integer, FieldVector, Polynomial, Proof, Query, SparseQuery, PowerQuery]
+
+    def __init__(self, top: int = 10, interval: float = 0.005, frames: int = 1):
+        """
+        :param top: number of allocation sites reported per section
+        :param interval: RSS sampling interval in seconds
+        :param frames: traceback depth stored per allocation
+        """
+        self.top = top
+        self.interval = interval
+        self.frames = frames
+        self.sections: List[Dict] = []
+
+        self.__started_tracing = False
+        self.__rss_peak = 0
+        self.__stop = threading.Event()
+        self.__sampler: Union[threading.Thread, None] = None
+
+    def __enter__(self) -> MemoryProfiler:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self.__started_tracing = True
+
+        self.__stop.clear()
+        self.__sampler = threading.Thread(target=self.__sample, daemon=True)
+        self.__sampler.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.__stop.set()
+        self.__sampler.join()
+        self.__sampler = None
+
+        if self.__started_tracing:
+            tracemalloc.stop()
+            self.__started_tracing = False
+        return False
+
+    @contextmanager
+    def section(self, name: str) -> Iterator[None]:
+        assert tracemalloc.is_tracing(), 'sections must run inside the profiler context'
+
+        gc.collect()
+        before = self.__snapshot()
+        start_traced, _ = tracemalloc.get_traced_memory()
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        start_rss = MemoryProfiler.get_rss()
+        self.__rss_peak = start_rss
+
+        yield
+
+        traced, traced_peak = tracemalloc.get_traced_memory()
+        end_rss = MemoryProfiler.get_rss()
+        after = self.__snapshot()
+
+        self.sections.append({
+            'name': name,
+            'traced_peak_bytes': traced_peak,
+            'traced_peak_growth_bytes': traced_peak - start_traced,
+            'traced_net_bytes': traced - start_traced,
+            'rss_start_bytes': start_rss,
+            'rss_end_bytes': end_rss,
+            'rss_peak_bytes': max(self.__rss_peak, end_rss),
+            'live_objects': MemoryProfiler.count_live_objects(),
+            'top_sites': [
+                {
+                    'site': f'{stat.traceback[0].filename}:{stat.traceback[0].lineno}',
+                    'size_bytes': stat.size_diff,
+                    'count': stat.count_diff,
+                }
+                for stat in after.compare_to(before, 'lineno')[:self.top]
+            ],
+        })
+
+    def report(self) -> Dict:
+        return {'version': 1, 'sections': self.sections}
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.report(), **kwargs)
+
+    @staticmethod
+    def count_live_objects() -> Dict[str, int]:
+        counts = {cls.__name__: 0 for cls in MemoryProfiler.tracked_classes}
+        names = {cls: cls.__name__ for cls in MemoryProfiler.tracked_classes}
+        for obj in gc.get_objects():
+            name = names.get(type(obj))
+            if name is not None:
+                counts[name] += 1
+
+        return counts
+
+    @staticmethod
+    def get_rss() -> int:
+        """
+        Current resident set size in bytes. Without /proc the process peak RSS is returned instead.
+        """
+        try:
+            with open('/proc/self/statm') as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError):
+            import resource
+
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return peak if sys.platform == 'darwin' else peak * 1024
+
+    def __sample(self):
+        while not self.__stop.wait(self.interval):
+            self.__rss_peak = max(self.__rss_peak, MemoryProfiler.get_rss())
+
+    @staticmethod
+    def __snapshot() -> tracemalloc.Snapshot:
+        # Leave out the profiler's own bookkeeping
+        return tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ])
@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import json
+from collections import Counter
+from functools import wraps
+from typing import Callable, Dict, List, Tuple
+
+from Unit.FieldVector import FieldVector
+from Unit.Integer import Integer
+from Unit.Phase import Phase, PhaseListener
+from Unit.Polynomial import Polynomial
+from Unit.PowerQuery import PowerQuery
+from Unit.Proof import Proof
+from Unit.Query import Query
+from Unit.SparseQuery import SparseQuery
+
+
+class OpCounter(PhaseListener):
+    """
+    Opt-in field-operation counters, attributed to the innermost active Phase ('other' outside any phase).
+
+        with OpCounter() as counter:
+            proof = circuit.make_proof(input_vec)
+        print(counter.to_json())
+
+    The counted methods of Integer, FieldVector, Polynomial, the query classes and Proof are wrapped on enter
+    and restored on exit, so nothing is wrapped and nothing is counted while no counter is active.
+    Bulk operations are counted by their logical size: a length-n dot product is n mults and n adds,
+    and a convolution counts the products of its schoolbook and NTT kernels.
+    Raw mpz arithmetic outside these methods, and work done in worker processes, is not counted.
+    """
+
+    OTHER = 'other'
+
+    __active: bool = False
+
+    def __init__(self):
+        self.counts: Dict[str, Counter] = {}
+        self.poly_mul_by_degree: Dict[str, Counter] = {}
+        self.__stack: List[str] = []
+        self.__originals: List[Tuple[type, str, object]] = []
+
+    def __enter__(self) -> OpCounter:
+        assert not OpCounter.__active, 'only one OpCounter can be active at a time'
+        OpCounter.__active = True
+
+        self.__install()
+        Phase.add_listener(self)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        Phase.remove_listener(self)
+        for cls, name, original in reversed(self.__originals):
+            setattr(cls, name, original)
+        self.__originals = []
+
+        OpCounter.__active = False
+        return False
+
+    def enter(self, name: str):
+        self.__stack.append(name)
+
+    def exit(self, name: str):
+        self.__stack.pop()
+
+    def add(self, op: str, amount: int = 1):
+        phase = self.__stack[-1] if len(self.__stack) > 0 else OpCounter.OTHER
+        if phase not in self.counts:
+            self.counts[phase] = Counter()
+        self.counts[phase][op] += amount
+
+    def add_poly_mul(self, xs_size: int, ys_size: int):
+        phase = self.__stack[-1] if len(self.__stack) > 0 else OpCounter.OTHER
+        if phase not in self.poly_mul_by_degree:
+            self.poly_mul_by_degree[phase] = Counter()
+        low, high = sorted((xs_size - 1, ys_size - 1))
+        self.poly_mul_by_degree[phase][f'{low}x{high}'] += 1
+        self.add('poly_mul')
+
+    def report(self) -> Dict:
+        total = Counter()
+        for counts in self.counts.values():
+            total.update(counts)
+
+        return {
+            'version': 1,
+            'phases': {
+                phase: {
+                    'ops': dict(self.counts.get(phase, {})),
+                    'poly_mul_by_degree': dict(self.poly_mul_by_degree.get(phase, {})),
+                }
+                for phase in sorted(set(self.counts) | set(self.poly_mul_by_degree))
+            },
+            'total': dict(total),
+        }
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.report(), **kwargs)
+
+    def __install(self):
+        def sized(xs, ys) -> int:
+            if hasattr(xs, '__len__') and hasattr(ys, '__len__'):
+                return min(len(xs), len(ys))
+            return len(xs) if hasattr(xs, '__len__') else len(ys)
+
+        def ntt_ops(n: int) -> Tuple[int, int, int]:
+            log = n.bit_length() - 1
+            return (n // 2) * log + n - 1 - log, n * log, log
+
+        def ntt(values, root, p):
+            mul, add, powmod = ntt_ops(len(values))
+            self.add('mul', mul)
+            self.add('add', add)
+            self.add('powmod', powmod)
+
+        def multiply_ntt(xs, ys):
+            length = len(xs) + len(ys) - 1
+            self.add('mul', (1 << (length - 1).bit_length()) + length)
+            self.add('inv', 2)
+
+        def schoolbook(xs, ys):
+            self.add('mul', len(xs) * len(ys))
+            self.add('add', len(xs) * len(ys))
+
+        def power_query_dot(query, vector):
+            span = query.stop - query.start
+            for x, _ in query.terms:
+                if x != 1:
+                    self.add('mul', span)
+                self.add('add', span)
+            self.add('mul', len(query.terms))
+
+        self.__patch(Integer, '__add__', lambda a, b: self.add('add'))
+        self.__patch(Integer, '__sub__', lambda a, b: self.add('add'))
+        self.__patch(Integer, '__mul__', lambda a, b: self.add('mul'))
+        self.__patch(Integer, '__pow__', lambda a, b: self.add('powmod'))
+        self.__patch(Integer, 'invert', lambda a: self.add('inv'))
+        self.__patch(Integer, 'inner_product', lambda xs, ys: (self.add('mul', len(xs)), self.add('add', len(xs))))
+        self.__patch(Integer, 'get_root_of_unity', lambda order: self.add('powmod'))
+
+        self.__patch(FieldVector, 'add', lambda a, b: self.add('add', len(a)))
+        self.__patch(FieldVector, 'sub', lambda a, b: self.add('add', len(a)))
+        self.__patch(FieldVector, 'scale', lambda a, c: self.add('mul', len(a)))
+        self.__patch(FieldVector, 'axpy', lambda a, c, x: (self.add('mul', len(x)), self.add('add', len(x))))
+        self.__patch(FieldVector, 'lazy_dot',
+                     lambda xs, ys: (self.add('mul', sized(xs, ys)), self.add('add', sized(xs, ys))))
+
+        self.__patch(Polynomial, 'multiply_raw', lambda xs, ys: self.add_poly_mul(len(xs), len(ys)))
+        self.__patch(Polynomial, 'multiply_schoolbook', schoolbook)
+        self.__patch(Polynomial, 'multiply_ntt', multiply_ntt)
+        self.__patch(Polynomial, 'ntt', ntt)
+        self.__patch(Polynomial, 'evaluate', lambda poly, x: (self.add('mul', len(poly.coefficients)),
+                                                              self.add('add', len(poly.coefficients))))
+        self.__patch(Polynomial, 'get_power_table', lambda x, size: self.add('mul', max(size - 1, 0)))
+
+        self.__patch(PowerQuery, 'dot', power_query_dot)
+        for cls in (Query, SparseQuery, PowerQuery):
+            self.__patch(cls, '__init__', lambda *args, name=cls.__name__, **kwargs: self.add(f'alloc.{name}'))
+
+        self.__patch(Proof, '__mul__', lambda proof, query: self.add('answer'))
+
+    def __patch(self, cls: type, name: str, count: Callable):
+        """
+        Wrap cls.name so that count sees the call arguments first. Static methods stay static.
+        """
+        original = cls.__dict__[name]
+        is_static = isinstance(original, staticmethod)
+        function = original.__func__ if is_static else original
+
+        # lazy_dot may be handed one-shot iterators; materialize them so that counting does not consume them
+        if cls is FieldVector and name == 'lazy_dot':
+            @wraps(function)
+            def wrapper(xs, ys):
+                if not hasattr(xs, '__len__') and not hasattr(ys, '__len__'):
+                    xs = list(xs)
+                count(xs, ys)
+                return function(xs, ys)
+        else:
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                count(*args, **kwargs)
+                return function(*args, **kwargs)
+
+        self.__originals.append((cls, name, original))
+        setattr(cls, name, staticmethod(wrapper) if is_static else wrapper)
@@ -2,6 +2,7 @@ from abc import *
 
 
 class Operand(metaclass=ABCMeta):
+    __slots__ = ()
 
     @abstractmethod
     def __add__(self, other):
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+from typing import List
+
+
+class PhaseListener:
+    """
+    Receives phase boundaries. Override the methods you need.
+    """
+
+    def enter(self, name: str):
+        pass
+
+    def exit(self, name: str):
+        pass
+
+
+class Phase:
+    """
+    Named prover and verifier phases, used by benchmarks and profilers to attribute work.
+
+        with Phase.of(Phase.INTERPOLATE):
+            ...
+
+    With no listener registered Phase.of returns a shared no-op context, so the markers cost one call each.
+    """
+
+    TRACE = 'trace'
+    INTERPOLATE = 'interpolate'
+    G_POLY = 'g_poly'
+    QUERY_GEN = 'query_gen'
+    ANSWER = 'answer'
+    CHECK = 'check'
+
+    ALL = [TRACE, INTERPOLATE, G_POLY, QUERY_GEN, ANSWER, CHECK]
+
+    __listeners: List[PhaseListener] = []
+
+    def __init__(self, name: str):
+        self.name = name
+
+    @staticmethod
+    def of(name: str):
+        if len(Phase.__listeners) == 0:
+            return _NULL_PHASE
+        return Phase(name)
+
+    @staticmethod
+    def add_listener(listener: PhaseListener):
+        Phase.__listeners.append(listener)
+
+    @staticmethod
+    def remove_listener(listener: PhaseListener):
+        Phase.__listeners.remove(listener)
+
+    def __enter__(self) -> Phase:
+        for listener in Phase.__listeners:
+            listener.enter(self.name)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        for listener in reversed(Phase.__listeners):
+            listener.exit(self.name)
+        return False
+
+
+class _NullPhase:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
@@ -1,113 +1,350 @@
 from __future__ import annotations
 
-import copy
-from typing import List, Union
+from functools import lru_cache
+from typing import List, Tuple, Union
 
-from gmpy2 import invert
+from gmpy2 import mpz, f_mod, powmod, invert
 
+from Unit.FieldVector import FieldVector
 from Unit.Integer import Integer
 from Unit.Operand import Operand
 from Unit.Query import Query
 
 
 class Polynomial(Operand):
-    def __init__(self, coefficients: List[Integer]):
+    # Products whose shorter operand has at least this many coefficients use the NTT when the prime allows it
+    ntt_threshold: int = 1024
+    # Crossovers from schoolbook to Karatsuba and from Karatsuba to Toom-3 (0 disables Toom-3)
+    karatsuba_threshold: int = 32
+    toom3_threshold: int = 128
+
+    def __init__(self, coefficients: Union[List[Integer], FieldVector]):
         assert len(coefficients) > 0
 
-        self.coefficients = coefficients
+        if not isinstance(coefficients, FieldVector):
+            coefficients = FieldVector.from_integers(coefficients)
+        self.coefficients: FieldVector = coefficients
 
     def __repr__(self):
         return str(self.coefficients)
 
     def __add__(self, other: Polynomial) -> Polynomial:
         if len(self.coefficients) > len(other.coefficients):
-            res = self.coefficients[:]
-            for i in range(len(other.coefficients)):
-                res[i] += other.coefficients[i]
+            longer, shorter = self.coefficients, other.coefficients
         else:
-            res = other.coefficients[:]
-            for i in range(len(self.coefficients)):
-                res[i] += self.coefficients[i]
+            longer, shorter = other.coefficients, self.coefficients
 
-        length = len(res)
-        for i in range(length - 1, -1, -1):
-            if res[i] == Integer(0):
-                res.pop(i)
-            else:
-                break
+        p = Integer.get_base()
+        res = longer.copy()
+        for i, v in enumerate(shorter.values):
+            res.values[i] = f_mod(res.values[i] + v, p)
 
-        return Polynomial(res)
+        return Polynomial(res.trim())
 
     def __mul__(self, other: Union[Polynomial, Integer, Query]) -> Union[Polynomial, Integer]:
         if isinstance(other, Integer):
-            res = self.coefficients[:]
-
-            for i in range(len(self.coefficients)):
-                res[i] *= other
-
-            for i in range(len(self.coefficients) - 1, -1, -1):
-                if res[i] == Integer(0):
-                    res.pop(i)
-                else:
-                    break
-
-            return Polynomial(res)
+            return Polynomial(self.coefficients.scale(other.n).trim())
         elif isinstance(other, Polynomial):
             deg = self.get_degree() + other.get_degree()
 
             assert deg >= 0
 
-            res = [Integer(0) for _ in range(deg + 1)]
-            for i in range(len(self.coefficients)):
-                for j in range(len(other.coefficients)):
-                    res[i + j] += self.coefficients[i] * other.coefficients[j]
+            p = Integer.get_base()
+            res = Polynomial.multiply_raw(self.coefficients.values, other.coefficients.values)
 
-            return Polynomial(res)
+            return Polynomial(FieldVector([f_mod(v, p) for v in res]))
         elif isinstance(other, Query):
             assert self.get_degree() + 1 == other.get_size()
 
-            res = Integer(0)
-            for i in range(len(self.coefficients)):
-                res += self.coefficients[i] * other.query[i]
-
-            return res
+            return Integer.from_reduced(self.coefficients.dot(other.query))
         else:
             assert False
 
+    @staticmethod
+    def multiply_raw(xs: List[mpz], ys: List[mpz]) -> List[mpz]:
+        """
+        Convolution of two coefficient lists. The result may be left unreduced.
+        """
+        length = len(xs) + len(ys) - 1
+        if min(len(xs), len(ys)) >= Polynomial.ntt_threshold:
+            size = 1 << (length - 1).bit_length()
+            if size.bit_length() - 1 <= Integer.get_two_adicity():
+                return Polynomial.multiply_ntt(xs, ys)
+
+        return Polynomial.multiply_subquadratic(xs, ys)
+
+    @staticmethod
+    def multiply_subquadratic(xs: List[mpz], ys: List[mpz]) -> List[mpz]:
+        """
+        Exact integer convolution choosing Toom-3, Karatsuba or schoolbook by the operand sizes
+        """
+        shorter = min(len(xs), len(ys))
+        if 0 < Polynomial.toom3_threshold <= shorter and 3 * shorter > 2 * max(len(xs), len(ys)):
+            return Polynomial.multiply_toom3(xs, ys)
+        if shorter >= Polynomial.karatsuba_threshold:
+            return Polynomial.multiply_karatsuba(xs, ys)
+
+        return Polynomial.multiply_schoolbook(xs, ys)
+
+    @staticmethod
+    def multiply_karatsuba(xs: List[mpz], ys: List[mpz]) -> List[mpz]:
+        n = len(xs) + len(ys) - 1
+        half = max(len(xs), len(ys)) // 2
+
+        if len(xs) <= half or len(ys) <= half:
+            # Unbalanced operands: split only the longer one
+            if len(xs) < len(ys):
+                xs, ys = ys, xs
+            low = Polynomial.multiply_subquadratic(xs[:half], ys)
+            high = Polynomial.multiply_subquadratic(xs[half:], ys)
+            res = low + [mpz(0)] * (n - len(low))
+            for i, v in enumerate(high):
+                res[half + i] += v
+            return res
+
+        x0, x1 = xs[:half], xs[half:]
+        y0, y1 = ys[:half], ys[half:]
+
+        z0 = Polynomial.multiply_subquadratic(x0, y0)
+        z2 = Polynomial.multiply_subquadratic(x1, y1)
+        z1 = Polynomial.multiply_subquadratic(Polynomial.__add_raw(x0, x1), Polynomial.__add_raw(y0, y1))
+
+        res = [mpz(0)] * n
+        for i, v in enumerate(z0):
+            res[i] += v
+            z1[i] -= v
+        for i, v in enumerate(z2):
+            res[2 * half + i] += v
+            z1[i] -= v
+        for i, v in enumerate(z1):
+            if i + half < n:
+                res[i + half] += v
+
+        return res
+
+    @staticmethod
+    def multiply_toom3(xs: List[mpz], ys: List[mpz]) -> List[mpz]:
+        """
+        Toom-3 over the integers with evaluation points 0, 1, -1, -2 and infinity.
+        Every division in the interpolation is exact, so no field inverse is needed.
+        """
+        n = len(xs) + len(ys) - 1
+        k = (max(len(xs), len(ys)) + 2) // 3
+
+        def split(values):
+            values = list(values) + [mpz(0)] * (3 * k - len(values))
+            return values[:k], values[k:2 * k], values[2 * k:]
+
+        def evaluate(a0, a1, a2):
+            p1 = [u + w for u, w in zip(a0, a2)]
+            return (a0,
+                    [u + v for u, v in zip(p1, a1)],
+                    [u - v for u, v in zip(p1, a1)],
+                    [u - 2 * v + 4 * w for u, v, w in zip(a0, a1, a2)],
+                    a2)
+
+        ex = evaluate(*split(xs))
+        ey = evaluate(*split(ys))
+        r0, r1, rm1, rm2, rinf = [Polynomial.multiply_subquadratic(a, b) for a, b in zip(ex, ey)]
+
+        # Bodrato's interpolation sequence
+        c3 = [(u - v) // 3 for u, v in zip(rm2, r1)]
+        c1 = [(u - v) // 2 for u, v in zip(r1, rm1)]
+        c2 = [u - v for u, v in zip(rm1, r0)]
+        c3 = [(u - v) // 2 + 2 * w for u, v, w in zip(c2, c3, rinf)]
+        c2 = [u + v - w for u, v, w in zip(c2, c1, rinf)]
+        c1 = [u - v for u, v in zip(c1, c3)]
+
+        res = [mpz(0)] * (4 * k + 2 * k - 1)
+        for shift, part in enumerate((r0, c1, c2, c3, rinf)):
+            for i, v in enumerate(part):
+                res[shift * k + i] += v
+
+        return res[:n]
+
+    @staticmethod
+    def __add_raw(xs: List[mpz], ys: List[mpz]) -> List[mpz]:
+        if len(xs) < len(ys):
+            xs, ys = ys, xs
+        res = list(xs)
+        for i, v in enumerate(ys):
+            res[i] += v
+
+        return res
+
+    @staticmethod
+    def multiply_schoolbook(xs: List[mpz], ys: List[mpz]) -> List[mpz]:
+        res = [mpz(0)] * (len(xs) + len(ys) - 1)
+        for i, a in enumerate(xs):
+            for j, b in enumerate(ys):
+                res[i + j] += a * b
+
+        return res
+
+    @staticmethod
+    def multiply_ntt(xs: List[mpz], ys: List[mpz]) -> List[mpz]:
+        """
+        Convolution through forward NTTs, a pointwise product and an inverse NTT.
+        The prime must have a root of unity of order at least len(xs) + len(ys) - 1 rounded up to a power of two.
+        """
+        length = len(xs) + len(ys) - 1
+        size = 1 << (length - 1).bit_length()
+        p = Integer.get_base()
+        root = Integer.get_root_of_unity(size)
+
+        fx = Polynomial.ntt(list(xs) + [mpz(0)] * (size - len(xs)), root, p)
+        fy = Polynomial.ntt(list(ys) + [mpz(0)] * (size - len(ys)), root, p)
+        res = Polynomial.ntt([f_mod(a * b, p) for a, b in zip(fx, fy)], invert(root, p), p)
+
+        size_inverse = invert(size, p)
+        return [f_mod(v * size_inverse, p) for v in res[:length]]
+
+    @staticmethod
+    def ntt(values: List[mpz], root: mpz, p: mpz) -> List[mpz]:
+        """
+        In-place iterative radix-2 number theoretic transform. root must have order len(values).
+        """
+        n = len(values)
+
+        # Bit-reversal permutation
+        j = 0
+        for i in range(1, n):
+            bit = n >> 1
+            while j & bit:
+                j ^= bit
+                bit >>= 1
+            j |= bit
+            if i < j:
+                values[i], values[j] = values[j], values[i]
+
+        length = 2
+        while length <= n:
+            half = length >> 1
+            step = powmod(root, n // length, p)
+            twiddles = [mpz(1)]
+            for _ in range(half - 1):
+                twiddles.append(f_mod(twiddles[-1] * step, p))
+
+            for start in range(0, n, length):
+                for k in range(half):
+                    u = values[start + k]
+                    v = f_mod(values[start + k + half] * twiddles[k], p)
+                    values[start + k] = f_mod(u + v, p)
+                    values[start + k + half] = f_mod(u - v, p)
+            length <<= 1
+
+        return values
+
+    @staticmethod
+    def inner_product(vec0: List[Polynomial], vec1: List[Polynomial]) -> Polynomial:
+        """
+        sum_i vec0[i] * vec1[i], accumulating every convolution unreduced and reducing once
+        """
+        assert len(vec0) == len(vec1) and len(vec0) > 0
+
+        p = Integer.get_base()
+        res = []
+        for a, b in zip(vec0, vec1):
+            product = Polynomial.multiply_raw(a.coefficients.values, b.coefficients.values)
+            if len(product) > len(res):
+                res.extend([mpz(0)] * (len(product) - len(res)))
+            for i, v in enumerate(product):
+                res[i] += v
+
+        return Polynomial(FieldVector([f_mod(v, p) for v in res]).trim())
+
+    @staticmethod
+    def get_power_table(x: Integer, size: int) -> List[mpz]:
+        """
+        Return [1, x, x^2, ..., x^(size - 1)] by successive multiplication
+        """
+        p = Integer.get_base()
+        res = [mpz(1)] * size
+        for i in range(1, size):
+            res[i] = f_mod(res[i - 1] * x.n, p)
+
+        return res
+
+    def evaluate(self, x: Integer) -> Integer:
+        """
+        Evaluate the polynomial at x with Horner's rule
+        """
+        p = Integer.get_base()
+        res = mpz(0)
+        for c in reversed(self.coefficients.values):
+            res = f_mod(res * x.n + c, p)
+
+        return Integer.from_reduced(res)
+
+    @staticmethod
+    def evaluate_all(polynomials: List[Polynomial], x: Integer) -> List[Integer]:
+        """
+        Evaluate every polynomial at the same point.
+        This is the matrix-vector product of the coefficient rows with one shared power table of x.
+        """
+        if len(polynomials) == 0:
+            return []
+
+        powers = Polynomial.get_power_table(x, max(len(poly.coefficients) for poly in polynomials))
+
+        return [Integer.from_reduced(FieldVector.lazy_dot(poly.coefficients.values, powers)) for poly in polynomials]
+
     @staticmethod
     def interpolate(points: List[Integer]) -> Polynomial:
-        n = len(points)
+        assert len(points) >= 1
 
-        assert n >= 1
+        return Polynomial.interpolate_all([points])[0]
 
-        A = [[Integer(idx ** i) for i in range(n)] for idx in range(len(points))]
-        b = points[:]
+    @staticmethod
+    def interpolate_all(points_list: List[List[Integer]]) -> List[Polynomial]:
+        """
+        Interpolate every point list over the nodes 0, 1, ..., n - 1 with a shared cached inverse Vandermonde matrix
+        """
+        assert len(points_list) > 0
 
-        # Solve Ax = b
-        coefficients = Polynomial.gauss_elimination(A, b)
+        n = len(points_list[0])
+        p = Integer.get_base()
+        matrix = Polynomial.get_interpolation_matrix(p, n)
 
-        return Polynomial(coefficients)
+        res = []
+        for points in points_list:
+            assert len(points) == n
 
-    def get_degree(self) -> int:
-        return len(self.coefficients) - 1
+            y = [point.n for point in points]
+            coefficients = [FieldVector.lazy_dot(row, y) for row in matrix]
+            res.append(Polynomial(FieldVector(coefficients)))
+
+        return res
 
     @staticmethod
-    def gauss_elimination(A, b):
-        n = len(A)
-
-        # Forward elimination
-        for i in range(n):
-            for j in range(i + 1, n):
-                factor = A[j][i] * A[i][i].invert()
-                for k in range(i, n):
-                    A[j][k] -= factor * A[i][k]
-                b[j] -= factor * b[i]
-
-        # Back substitution
-        x = [0] * n
-        for i in range(n - 1, -1, -1):
-            x[i] = b[i] * A[i][i].invert()
-            for j in range(i):
-                b[j] -= A[j][i] * x[i]
-
-        return x
\ No newline at end of file
+    @lru_cache(maxsize=64)
+    def get_interpolation_matrix(p: mpz, n: int) -> Tuple[Tuple[mpz, ...], ...]:
+        """
+        Inverse of the Vandermonde matrix over the nodes 0, 1, ..., n - 1 modulo p.
+        Column j holds the coefficients of the j-th Lagrange basis polynomial.
+        """
+        # M(x) = (x - 0)(x - 1)...(x - (n - 1)), lowest degree first
+        master = [mpz(1)]
+        for k in range(n):
+            nxt = [mpz(0)] * (len(master) + 1)
+            for i, c in enumerate(master):
+                nxt[i] = f_mod(nxt[i] - k * c, p)
+                nxt[i + 1] = f_mod(nxt[i + 1] + c, p)
+            master = nxt
+
+        weights = Integer.get_node_weights(n)
+        columns = []
+        for j in range(n):
+            # M(x) / (x - j) by synthetic division
+            quotient = [mpz(0)] * n
+            carry = mpz(0)
+            for i in range(n, 0, -1):
+                carry = f_mod(master[i] + carry * j, p)
+                quotient[i - 1] = carry
+
+            columns.append([f_mod(q * weights[j], p) for q in quotient])
+
+        return tuple(tuple(columns[j][i] for j in range(n)) for i in range(n))
+
+    def get_degree(self) -> int:
+        return len(self.coefficients) - 1
\ No newline at end of file
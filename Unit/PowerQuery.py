@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+from typing import List, Tuple, Union, TYPE_CHECKING
+
+from gmpy2 import mpz, f_mod
+
+from Unit.FieldVector import FieldVector
+from Unit.Integer import Integer
+from Unit.Operand import Operand
+from Unit.SparseQuery import SparseQuery
+
+if TYPE_CHECKING:
+    from Unit.Query import Query
+
+
+class PowerQuery(Operand):
+    """
+    Succinct query sum_t w_t * (1, x_t, x_t^2, ...) placed on the index range [start, stop) of a size-long vector.
+    Only the (x_t, w_t) terms are stored, and the answer against a proof is computed with Horner's rule over the range.
+    """
+
+    def __init__(self, size: int, start: int, stop: int, terms: List[Tuple[mpz, mpz]]):
+        assert 0 <= start <= stop <= size
+
+        self.size = size
+        self.start = start
+        self.stop = stop
+        self.terms: List[Tuple[mpz, mpz]] = terms
+
+    @staticmethod
+    def powers(size: int, start: int, stop: int, x: Integer) -> PowerQuery:
+        """
+        Query holding 1, x, x^2, ... on [start, stop) and zero elsewhere
+        """
+        return PowerQuery(size, start, stop, [(x.n, mpz(1))])
+
+    def __repr__(self) -> str:
+        return f'PowerQuery({self.size}, [{self.start}, {self.stop}), {[(int(x), int(w)) for x, w in self.terms]})'
+
+    def to_sparse(self) -> SparseQuery:
+        p = Integer.get_base()
+        entries = {}
+        for x, w in self.terms:
+            a = w
+            for i in range(self.start, self.stop):
+                s = f_mod(entries.get(i, 0) + a, p)
+                if s == 0:
+                    entries.pop(i, None)
+                else:
+                    entries[i] = s
+                a = f_mod(a * x, p)
+
+        return SparseQuery(self.size, entries)
+
+    def to_dense(self) -> Query:
+        return self.to_sparse().to_dense()
+
+    def __add__(self, other: Union[PowerQuery, SparseQuery, Query]) -> Union[PowerQuery, SparseQuery, Query]:
+        assert self.size == other.get_size()
+
+        if isinstance(other, PowerQuery) and (self.start, self.stop) == (other.start, other.stop):
+            return PowerQuery(self.size, self.start, self.stop, self.terms + other.terms)
+
+        if isinstance(other, PowerQuery):
+            other = other.to_sparse()
+        return self.to_sparse() + other
+
+    def __sub__(self, other: Union[PowerQuery, SparseQuery, Query]) -> Union[PowerQuery, SparseQuery, Query]:
+        return self + other * Integer(-1)
+
+    def __mul__(self, other: Integer) -> PowerQuery:
+        p = Integer.get_base()
+        return PowerQuery(self.size, self.start, self.stop, [(x, f_mod(w * other.n, p)) for x, w in self.terms])
+
+    def dot(self, vector: FieldVector) -> mpz:
+        assert self.size == len(vector)
+
+        p = Integer.get_base()
+        segment = vector.values[self.start:self.stop]
+        res = mpz(0)
+        for x, w in self.terms:
+            if x == 1:
+                acc = sum(segment, mpz(0))
+            else:
+                acc = mpz(0)
+                for v in reversed(segment):
+                    acc = f_mod(acc * x + v, p)
+            res += w * acc
+
+        return f_mod(res, p)
+
+    def get_size(self) -> int:
+        return self.size
+
+    def get_wire_size(self) -> int:
+        from Unit.WireFormat import WireFormat
+
+        return WireFormat.get_wire_size(self)
@@ -1,31 +1,102 @@
-from typing import List
+from typing import BinaryIO, Iterable, Iterator, List, Tuple, Union
 
+from Unit.FieldVector import FieldVector
 from Unit.Integer import Integer
+from Unit.PowerQuery import PowerQuery
 from Unit.Query import Query
+from Unit.SparseQuery import SparseQuery
 
 
 class Proof:
+    # Segment kinds, in the order a prover produces them
+    INPUT = 'input'
+    RANDOM = 'random'
+    COEFFICIENT = 'coefficient'
 
-    def __init__(self, proof: List[Integer]):
-        self.proof = proof
+    __segment_codes = {INPUT: 0, RANDOM: 1, COEFFICIENT: 2}
+    __segment_kinds = {code: kind for kind, code in __segment_codes.items()}
+
+    def __init__(self, proof: Union[List[Integer], FieldVector], segments: List[Tuple[str, int]] = None):
+        if not isinstance(proof, FieldVector):
+            proof = FieldVector.from_integers(proof)
+        self.proof: FieldVector = proof
+        self.segments: List[Tuple[str, int]] = segments if segments is not None else [(Proof.COEFFICIENT, len(proof))]
+
+        assert sum(size for _, size in self.segments) == len(self.proof)
+
+    @staticmethod
+    def from_segments(segments: Iterable[Tuple[str, FieldVector]]) -> 'Proof':
+        """
+        Concatenate the segments yielded by a streaming prover into one proof
+        """
+        values = []
+        layout = []
+        for kind, vector in segments:
+            values.extend(vector.values)
+            layout.append((kind, len(vector)))
+
+        return Proof(FieldVector(values), layout)
+
+    @staticmethod
+    def write_segments(segments: Iterable[Tuple[str, FieldVector]], sink: BinaryIO) -> List[Tuple[str, int]]:
+        """
+        Write each segment to sink as soon as it is produced.
+        Each frame is a one-byte kind, an 8-byte little-endian element count and the fixed-width elements.
+        """
+        width = Integer.get_byte_width()
+        layout = []
+        for kind, vector in segments:
+            sink.write(Proof.__segment_codes[kind].to_bytes(1, 'little'))
+            sink.write(len(vector).to_bytes(8, 'little'))
+            sink.write(vector.to_bytes(width))
+            layout.append((kind, len(vector)))
+
+        return layout
+
+    @staticmethod
+    def read_segments(source: BinaryIO) -> Iterator[Tuple[str, FieldVector]]:
+        """
+        Read frames written by write_segments until the source is exhausted.
+        A truncated frame or an unknown segment code raises ValueError.
+        """
+        width = Integer.get_byte_width()
+        while True:
+            code = source.read(1)
+            if len(code) == 0:
+                return
+            kind = Proof.__segment_kinds.get(code[0])
+            if kind is None:
+                raise ValueError(f'unknown segment code {code[0]}')
+
+            size = source.read(8)
+            if len(size) != 8:
+                raise ValueError('truncated frame header')
+            size = int.from_bytes(size, 'little')
+
+            payload = source.read(size * width)
+            if len(payload) != size * width:
+                raise ValueError(f'truncated {kind} segment')
+            yield kind, FieldVector.from_bytes(payload, width)
 
     def __repr__(self) -> str:
         return str(self.proof)
 
-    def __mul__(self, other: Query) -> Integer:
-        assert len(self.proof) == len(other.query)
+    def __mul__(self, other: Union[Query, SparseQuery, PowerQuery]) -> Integer:
+        if isinstance(other, (SparseQuery, PowerQuery)):
+            return Integer.from_reduced(other.dot(self.proof))
 
-        res = Integer(0)
-        for i in range(len(self.proof)):
-            res += self.proof[i] * other.query[i]
-
-        return res
+        return Integer.from_reduced(self.proof.dot(other.query))
 
     def get_size(self) -> int:
         return len(self.proof)
 
     def get_byte_size(self) -> int:
-        total_bytes = 0
-        for p in self.proof:
-            total_bytes += p.get_size()
-        return total_bytes
+        """
+        In-memory size of the element objects. See get_wire_size for the serialized size.
+        """
+        return self.proof.get_byte_size()
+
+    def get_wire_size(self) -> int:
+        from Unit.WireFormat import WireFormat
+
+        return WireFormat.get_wire_size(self)
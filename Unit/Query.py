@@ -1,90 +1,93 @@
 from __future__ import annotations
 
-import copy
-from typing import List, TYPE_CHECKING
-
-from operator import add
+from typing import List, TYPE_CHECKING, Union
 
+from Unit.FieldVector import FieldVector
 from Unit.Integer import Integer
 from Unit.Operand import Operand
 
 if TYPE_CHECKING:
-    from Base.GGate import GGate
+    from Unit.SparseQuery import SparseQuery
 
 
 class Query(Operand):
-    g_gate_ref = []
-    coefficient_size = 0
 
-    def __init__(self, query: List[Integer]):
-        self.query = query
+    def __init__(self, query: Union[List[Integer], FieldVector]):
+        if not isinstance(query, FieldVector):
+            query = FieldVector.from_integers(query)
+        self.query: FieldVector = query
 
     def __repr__(self) -> str:
         return f'Query({self.query})'
 
-    def __add__(self, other: Query) -> Query:
-        assert len(self.query) == len(other.query)
-
-        res = self.query[:]
-        for i in range(len(self.query)):
-            res[i] += other.query[i]
-
-        return Query(res)
+    def __add__(self, other: Union[Query, SparseQuery]) -> Query:
+        if not isinstance(other, Query):
+            return other + self
 
-    def __sub__(self, other: Query) -> Query:
-        assert len(self.query) == len(other.query)
+        return Query(self.query.add(other.query))
 
-        res = self.query[:]
-        for i in range(len(self.query)):
-            res[i] -= other.query[i]
+    def __sub__(self, other: Union[Query, SparseQuery]) -> Query:
+        if not isinstance(other, Query):
+            return other * Integer(-1) + self
 
-        return Query(res)
+        return Query(self.query.sub(other.query))
 
     def __mul__(self, other: Integer) -> Query:
-        res = self.query[:]
-        for i in range(len(self.query)):
-            res[i] *= other
+        return Query(self.query.scale(other.n))
 
-        return Query(res)
+    @staticmethod
+    def get_lagrange_weights(n: int, r: Integer) -> List[Integer]:
+        """
+        Return L_0(r), ..., L_{n-1}(r) for the Lagrange basis over the nodes 0, 1, ..., n - 1
+        """
+        weights = Integer.get_node_weights(n)
+
+        # prefix[i] = (r - 0)...(r - (i - 1)), suffix[i] = (r - i)...(r - (n - 1))
+        prefix = [Integer.ONE]
+        for j in range(n):
+            prefix.append(prefix[-1] * (r - Integer(j)))
+        suffix = [Integer.ONE]
+        for j in range(n - 1, -1, -1):
+            suffix.append(suffix[-1] * (r - Integer(j)))
+        suffix.reverse()
+
+        return [prefix[i] * suffix[i + 1] * Integer.from_reduced(weights[i]) for i in range(n)]
 
     @staticmethod
     def new_interpolate(points: List[Query], r: Integer) -> Query:
-        result = [Integer(0) for _ in range(points[0].get_size())]
-        for i in range(len(points)):
-            term = copy.deepcopy(points[i])
-            for j in range(len(points)):
-                if i == j:
-                    continue
-                for k in range(len(term.query)):
-                    term.query[k] *= (r + Integer(-j)) * Integer(i - j).invert()
-            result = list(map(add, result, term.query))
+        weights = Query.get_lagrange_weights(len(points), r)
+
+        result = FieldVector.zeros(points[0].get_size())
+        for point, weight in zip(points, weights):
+            result.axpy(weight.n, point.query)
 
         return Query(result)
 
     @staticmethod
-    def interpolate(y_values: List[Query], r: Integer):
+    def interpolate(y_values: List[Union[Query, SparseQuery]], r: Integer) -> Union[Query, SparseQuery]:
         n = len(y_values)
 
-        divided_diff = [[Query([Integer(0) for _ in range(y_values[0].get_size())]) for _ in range(n)] for _ in range(n)]
-        for i in range(n):
-            divided_diff[i][0] = y_values[i]
-
+        divided_diff = [y_values[:]]
         for j in range(1, n):
-            for i in range(n - j):
-                divided_diff[i][j] = (divided_diff[i + 1][j - 1] - divided_diff[i][j - 1]) * Integer(j).invert()
+            prev = divided_diff[j - 1]
+            divided_diff.append([(prev[i + 1] - prev[i]) * Integer.get_small_inverse(j) for i in range(n - j)])
 
         coefficients = []
         for i in range(n):
-            coefficients.append(divided_diff[0][i])
+            coefficients.append(divided_diff[i][0])
 
-        polynomial_value = Query([Integer(0) for _ in range(y_values[0].get_size())])
-        product_term = Integer(1)
-        for i in range(n):
+        polynomial_value = coefficients[0]
+        product_term = Integer.ONE
+        for i in range(1, n):
+            product_term *= (r - Integer(i - 1))
             polynomial_value += coefficients[i] * product_term
-            product_term *= (r - Integer(i))
 
         return polynomial_value
 
-
     def get_size(self):
         return len(self.query)
+
+    def get_wire_size(self) -> int:
+        from Unit.WireFormat import WireFormat
+
+        return WireFormat.get_wire_size(self)
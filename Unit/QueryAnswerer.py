@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import sys
+from multiprocessing import resource_tracker, shared_memory
+from typing import List, Union
+
+from gmpy2 import mpz
+
+from Unit.FieldVector import FieldVector
+from Unit.Integer import Integer
+from Unit.Proof import Proof
+from Unit.Query import Query
+from Unit.SparseQuery import SparseQuery
+from Unit.WorkerPool import WorkerPool
+
+
+class QueryAnswerer:
+    """
+    Answer a list of queries against one proof.
+    With more than one worker the proof is written once into shared memory as fixed-width field elements
+    and the queries are fanned out in chunks across the shared WorkerPool. Each chunk decodes the proof from
+    the segment once and answers all of its queries from the decoded elements. Answers are returned in query order.
+    """
+
+    # Number of query chunks handed to each worker
+    chunks_per_worker: int = 4
+
+    @staticmethod
+    def answer(proof: Proof, queries: List[Union[Query, SparseQuery]], workers: int = 1) -> List[Integer]:
+        if workers <= 1 or len(queries) < 2:
+            return [proof * query for query in queries]
+
+        width = Integer.get_byte_width()
+        payload = proof.proof.to_bytes(width)
+        memory = shared_memory.SharedMemory(create=True, size=max(len(payload), 1))
+        try:
+            memory.buf[:len(payload)] = payload
+
+            chunk_count = min(len(queries), workers * QueryAnswerer.chunks_per_worker)
+            bounds = [len(queries) * i // chunk_count for i in range(chunk_count + 1)]
+            executor = WorkerPool.get(workers)
+            futures = [
+                executor.submit(_answer_chunk, memory.name, len(payload), width, Integer.get_base(),
+                                queries[bounds[i]:bounds[i + 1]])
+                for i in range(chunk_count)
+            ]
+            res = []
+            for future in futures:
+                res.extend(Integer.from_reduced(v) for v in future.result())
+        finally:
+            memory.close()
+            memory.unlink()
+
+        return res
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """
+    Attach to a segment owned by the answering process without taking ownership of it
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+
+    # Older versions register every attached segment with the resource tracker, which would then report it as
+    # leaked, or unlink it, once the worker exits. Unregistering afterwards is not enough: a worker forked after
+    # the tracker started shares it with the owner, and would drop the owner's entry. Skip the registration instead;
+    # a pool worker runs one task at a time, so nothing else registers meanwhile.
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+def _answer_chunk(name: str, size: int, width: int, base: mpz,
+                  queries: List[Union[Query, SparseQuery]]) -> List[mpz]:
+    if Integer.get_base() != base:
+        Integer.set_base(base)
+
+    memory = _attach(name)
+    try:
+        proof = Proof(FieldVector.from_bytes(memory.buf[:size], width))
+    finally:
+        memory.close()
+
+    return [(proof * query).n for query in queries]
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+from typing import Dict, Union, TYPE_CHECKING
+
+from gmpy2 import mpz, f_mod
+
+from Unit.FieldVector import FieldVector
+from Unit.Integer import Integer
+from Unit.Operand import Operand
+from Unit.Query import Query
+
+if TYPE_CHECKING:
+    from Unit.PowerQuery import PowerQuery
+
+
+class SparseQuery(Operand):
+    """
+    Query vector storing only its nonzero entries as index/value pairs.
+    Values are raw reduced mpz values.
+    """
+
+    def __init__(self, size: int, entries: Dict[int, mpz]):
+        self.size = size
+        self.entries: Dict[int, mpz] = entries
+
+    @staticmethod
+    def unit(size: int, index: int) -> SparseQuery:
+        assert 0 <= index < size
+
+        return SparseQuery(size, {index: mpz(1)})
+
+    @staticmethod
+    def from_dense(query: Query) -> SparseQuery:
+        return SparseQuery(query.get_size(), {i: v for i, v in enumerate(query.query.values) if v != 0})
+
+    def to_dense(self) -> Query:
+        res = FieldVector.zeros(self.size)
+        for i, v in self.entries.items():
+            res.values[i] = v
+
+        return Query(res)
+
+    def __repr__(self) -> str:
+        return f'SparseQuery({self.size}, {dict(sorted((i, int(v)) for i, v in self.entries.items()))})'
+
+    def __add__(self, other: Union[SparseQuery, Query, PowerQuery]) -> Union[SparseQuery, Query]:
+        assert self.size == other.get_size()
+
+        p = Integer.get_base()
+        if not isinstance(other, (SparseQuery, Query)):
+            return other + self
+        elif isinstance(other, SparseQuery):
+            res = dict(self.entries)
+            for i, v in other.entries.items():
+                s = f_mod(res.get(i, 0) + v, p)
+                if s == 0:
+                    res.pop(i, None)
+                else:
+                    res[i] = s
+            return SparseQuery(self.size, res)
+        else:
+            res = other.query.copy()
+            for i, v in self.entries.items():
+                res.values[i] = f_mod(res.values[i] + v, p)
+            return type(other)(res)
+
+    def __sub__(self, other: Union[SparseQuery, Query, PowerQuery]) -> Union[SparseQuery, Query]:
+        return self + other * Integer(-1)
+
+    def __mul__(self, other: Integer) -> SparseQuery:
+        if other.n == 0:
+            return SparseQuery(self.size, {})
+
+        p = Integer.get_base()
+        return SparseQuery(self.size, {i: f_mod(v * other.n, p) for i, v in self.entries.items()})
+
+    def dot(self, vector: FieldVector) -> mpz:
+        assert self.size == len(vector)
+
+        values = vector.values
+        return FieldVector.lazy_dot(self.entries.values(), (values[i] for i in self.entries))
+
+    def get_size(self) -> int:
+        return self.size
+
+    def get_nonzero_count(self) -> int:
+        return len(self.entries)
+
+    def get_wire_size(self) -> int:
+        from Unit.WireFormat import WireFormat
+
+        return WireFormat.get_wire_size(self)
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import struct
+from typing import List, Union
+
+from gmpy2 import mpz
+
+from Unit.Integer import Integer
+from Unit.Proof import Proof
+from Unit.WireFormat import WireFormat
+
+
+class Transcript:
+    """
+    Self-contained non-interactive proof: the claimed circuit output and the proof of every round.
+    The challenges are not stored; the verifier re-derives them with FiatShamir.
+
+    Layout (all integers little-endian):
+        header  magic 'FLPT', version u16, proof count u32
+        result  fixed-width field element
+        proofs  (length u64, proof in wire format) per proof
+    """
+
+    MAGIC = b'FLPT'
+    VERSION = 1
+
+    __header = struct.Struct('<4sHI')
+    __length = struct.Struct('<Q')
+
+    def __init__(self, result: Integer, proofs: List[Proof]):
+        self.result = result
+        self.proofs = proofs
+
+    def to_bytes(self) -> bytes:
+        res = [
+            Transcript.__header.pack(Transcript.MAGIC, Transcript.VERSION, len(self.proofs)),
+            int(self.result.n).to_bytes(Integer.get_byte_width(), 'little'),
+        ]
+        for proof in self.proofs:
+            encoded = WireFormat.dumps(proof)
+            res.append(Transcript.__length.pack(len(encoded)))
+            res.append(encoded)
+
+        return b''.join(res)
+
+    @staticmethod
+    def from_bytes(buffer: Union[bytes, memoryview]) -> Transcript:
+        buffer = memoryview(buffer)
+        if len(buffer) < Transcript.__header.size:
+            raise ValueError('truncated header')
+
+        magic, version, proof_count = Transcript.__header.unpack_from(buffer, 0)
+        if magic != Transcript.MAGIC:
+            raise ValueError('not a FLPT buffer')
+        if version != Transcript.VERSION:
+            raise ValueError(f'unsupported version {version}')
+
+        width = Integer.get_byte_width()
+        offset = Transcript.__header.size
+        value = mpz(int.from_bytes(buffer[offset:offset + width], 'little'))
+        if value >= Integer.get_base():
+            raise ValueError('result is not a field element')
+        offset += width
+
+        proofs = []
+        for _ in range(proof_count):
+            if len(buffer) < offset + Transcript.__length.size:
+                raise ValueError('truncated proof')
+            size, = Transcript.__length.unpack_from(buffer, offset)
+            offset += Transcript.__length.size
+            proof = WireFormat.loads(buffer[offset:offset + size])
+            if not isinstance(proof, Proof):
+                raise ValueError('transcript entry is not a proof')
+            proofs.append(proof)
+            offset += size
+
+        return Transcript(Integer.from_reduced(value), proofs)
+
+    def get_wire_size(self) -> int:
+        return (Transcript.__header.size + Integer.get_byte_width()
+                + sum(Transcript.__length.size + WireFormat.get_wire_size(proof) for proof in self.proofs))
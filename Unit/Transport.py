@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import asyncio
+import struct
+from abc import *
+from typing import Awaitable, Callable, Tuple, Union
+
+
+class Transport(metaclass=ABCMeta):
+    """
+    Base message transport for interactive sessions. Messages are opaque byte strings delivered in order.
+    """
+
+    @abstractmethod
+    async def send(self, message: bytes):
+        pass
+
+    @abstractmethod
+    async def recv(self) -> bytes:
+        """
+        Return the next message; raise ConnectionError once the peer has closed the transport
+        """
+        pass
+
+    @abstractmethod
+    async def close(self):
+        pass
+
+
+class MemoryTransport(Transport):
+    """
+    One end of an in-process channel. Use MemoryTransport.pair() to create both ends.
+    """
+
+    def __init__(self, inbox: asyncio.Queue, outbox: asyncio.Queue):
+        self.inbox = inbox
+        self.outbox = outbox
+
+    @staticmethod
+    def pair() -> Tuple[MemoryTransport, MemoryTransport]:
+        a, b = asyncio.Queue(), asyncio.Queue()
+        return MemoryTransport(a, b), MemoryTransport(b, a)
+
+    async def send(self, message: bytes):
+        await self.outbox.put(bytes(message))
+
+    async def recv(self) -> bytes:
+        message: Union[bytes, None] = await self.inbox.get()
+        if message is None:
+            # Leave the marker for any later recv
+            self.inbox.put_nowait(None)
+            raise ConnectionError('channel closed')
+        return message
+
+    async def close(self):
+        await self.outbox.put(None)
+
+
+class TcpTransport(Transport):
+    """
+    Stream transport. Each message is framed as an 8-byte little-endian length followed by the message.
+    """
+
+    __length = struct.Struct('<Q')
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    @staticmethod
+    async def connect(host: str, port: int) -> TcpTransport:
+        reader, writer = await asyncio.open_connection(host, port)
+        return TcpTransport(reader, writer)
+
+    @staticmethod
+    async def serve(handler: Callable[[TcpTransport], Awaitable[None]], host: str = '127.0.0.1',
+                    port: int = 0) -> asyncio.AbstractServer:
+        """
+        Start a server that runs handler on a new transport for every connection.
+        With port 0 the system picks a free port; read it from server.sockets[0].getsockname().
+        """
+        async def on_connect(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+            transport = TcpTransport(reader, writer)
+            try:
+                await handler(transport)
+            finally:
+                await transport.close()
+
+        return await asyncio.start_server(on_connect, host, port)
+
+    async def send(self, message: bytes):
+        self.writer.write(TcpTransport.__length.pack(len(message)))
+        self.writer.write(message)
+        await self.writer.drain()
+
+    async def recv(self) -> bytes:
+        try:
+            size, = TcpTransport.__length.unpack(await self.reader.readexactly(TcpTransport.__length.size))
+            return await self.reader.readexactly(size)
+        except asyncio.IncompleteReadError as e:
+            raise ConnectionError('connection closed') from e
+
+    async def close(self):
+        if not self.writer.is_closing():
+            self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import mmap
+import struct
+import zlib
+from contextlib import contextmanager
+from typing import Iterable, Iterator, List, Tuple, Union
+
+from gmpy2 import mpz
+
+from Unit.FieldVector import FieldVector, FieldView
+from Unit.Integer import Integer
+from Unit.PowerQuery import PowerQuery
+from Unit.Proof import Proof
+from Unit.Query import Query
+from Unit.SparseQuery import SparseQuery
+
+
+class WireFormat:
+    """
+    Versioned binary format for Proof, Query and SparseQuery.
+
+    Layout (all integers little-endian):
+        header   magic 'FLPW', version u16, object kind u8, element width u16, segment count u32
+        prime    width bytes
+        segments (kind u8, element count u64) per segment
+        trailer  payload length u64, CRC-32 of everything before the checksum and of the payload u32
+        payload  fixed-width field elements; a sparse query stores (index u64, value) pairs by increasing index and
+                 a power query stores start u64, stop u64 and (x, weight) pairs
+
+    Elements are sized from Integer.get_base(), so a 127-bit prime takes 16 bytes per element.
+    """
+
+    MAGIC = b'FLPW'
+    VERSION = 1
+
+    PROOF = 0
+    QUERY = 1
+    SPARSE_QUERY = 2
+    POWER_QUERY = 3
+
+    __header = struct.Struct('<4sHBHI')
+    __segment = struct.Struct('<BQ')
+    __payload_size = struct.Struct('<Q')
+    __checksum = struct.Struct('<I')
+    __index = struct.Struct('<Q')
+    __range = struct.Struct('<QQ')
+
+    __segment_codes = {Proof.INPUT: 0, Proof.RANDOM: 1, Proof.COEFFICIENT: 2, 'query': 3}
+    __segment_kinds = {code: kind for kind, code in __segment_codes.items()}
+
+    @staticmethod
+    def dumps(obj: Union[Proof, Query, SparseQuery, PowerQuery]) -> bytes:
+        width = Integer.get_byte_width()
+
+        if isinstance(obj, Proof):
+            kind = WireFormat.PROOF
+            segments = obj.segments
+            payload = obj.proof.to_bytes(width)
+        elif isinstance(obj, Query):
+            kind = WireFormat.QUERY
+            segments = [('query', obj.get_size())]
+            payload = obj.query.to_bytes(width)
+        elif isinstance(obj, SparseQuery):
+            kind = WireFormat.SPARSE_QUERY
+            segments = [('query', obj.get_size())]
+            payload = b''.join(WireFormat.__index.pack(i) + int(v).to_bytes(width, 'little')
+                               for i, v in sorted(obj.entries.items()))
+        elif isinstance(obj, PowerQuery):
+            kind = WireFormat.POWER_QUERY
+            segments = [('query', obj.get_size())]
+            payload = WireFormat.__range.pack(obj.start, obj.stop) + b''.join(
+                int(x).to_bytes(width, 'little') + int(w).to_bytes(width, 'little') for x, w in obj.terms)
+        else:
+            assert False
+
+        return WireFormat.__make_header(kind, width, segments, payload) + payload
+
+    @staticmethod
+    def loads(buffer: Union[bytes, memoryview, mmap.mmap],
+              verify: bool = True) -> Union[Proof, Query, SparseQuery, PowerQuery]:
+        """
+        Decode an object. Proofs and dense queries keep a zero-copy read-only view of the buffer.
+        Malformed or corrupt data raises ValueError. Elements of proofs and dense queries are checked to be
+        below the prime only if verify is set; sparse and power query values are always checked.
+        """
+        buffer = memoryview(buffer)
+        kind, width, segments, offset, payload_size, checksum = WireFormat.__parse_header(buffer)
+
+        payload = buffer[offset:offset + payload_size]
+        if len(payload) != payload_size:
+            raise ValueError('truncated payload')
+        if verify and zlib.crc32(payload, zlib.crc32(buffer[:offset - WireFormat.__checksum.size])) != checksum:
+            raise ValueError('checksum mismatch')
+
+        if kind == WireFormat.PROOF:
+            if sum(size for _, size in segments) * width != payload_size:
+                raise ValueError('segment sizes do not match the payload')
+            vector = FieldVector.view(payload, width)
+            if verify:
+                WireFormat.__check_elements(vector.values)
+            return Proof(vector, segments)
+
+        size = segments[0][1]
+        if kind == WireFormat.QUERY:
+            if size * width != payload_size:
+                raise ValueError('query size does not match the payload')
+            vector = FieldVector.view(payload, width)
+            if verify:
+                WireFormat.__check_elements(vector.values)
+            return Query(vector)
+        elif kind == WireFormat.SPARSE_QUERY:
+            entry_size = WireFormat.__index.size + width
+            if payload_size % entry_size != 0:
+                raise ValueError('sparse query payload is not a whole number of entries')
+            entries = {}
+            previous = -1
+            for i in range(0, payload_size, entry_size):
+                index, = WireFormat.__index.unpack_from(payload, i)
+                # dumps writes the indices in increasing order, so a repeated index is corrupt data
+                if not previous < index < size:
+                    raise ValueError(f'sparse query index {index} out of order or out of range')
+                entries[index] = mpz(int.from_bytes(payload[i + WireFormat.__index.size:i + entry_size], 'little'))
+                previous = index
+            WireFormat.__check_elements(entries.values())
+            return SparseQuery(size, entries)
+        else:
+            if payload_size < WireFormat.__range.size or (payload_size - WireFormat.__range.size) % (2 * width) != 0:
+                raise ValueError('power query payload is not a range and whole terms')
+            start, stop = WireFormat.__range.unpack_from(payload, 0)
+            if not start <= stop <= size:
+                raise ValueError(f'power query range [{start}, {stop}) out of range')
+            field = FieldVector.view(payload[WireFormat.__range.size:], width).values
+            WireFormat.__check_elements(field)
+            terms = [(field[i], field[i + 1]) for i in range(0, len(field), 2)]
+            return PowerQuery(size, start, stop, terms)
+
+    @staticmethod
+    def save(obj: Union[Proof, Query, SparseQuery, PowerQuery], path: str):
+        with open(path, 'wb') as f:
+            f.write(WireFormat.dumps(obj))
+
+    @staticmethod
+    def load(path: str, verify: bool = True) -> Union[Proof, Query, SparseQuery, PowerQuery]:
+        """
+        Memory-map the file read-only and decode it without copying the elements.
+        The mapping stays open until the object is garbage collected; use load_mapped to unmap it deterministically.
+        """
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        return WireFormat.loads(mapped, verify)
+
+    @staticmethod
+    @contextmanager
+    def load_mapped(path: str, verify: bool = True) -> Iterator[Union[Proof, Query, SparseQuery, PowerQuery]]:
+        """
+        Like load, but the file is unmapped when the block exits. The object reads from the mapping,
+        so it must not be used after the block.
+
+            with WireFormat.load_mapped(path) as proof:
+                answers = QueryAnswerer.answer(proof, queries)
+        """
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            obj = WireFormat.loads(mapped, verify)
+            try:
+                yield obj
+            finally:
+                # Views into the mapping keep it exported, and an exported mapping cannot be closed
+                vector = obj.proof if isinstance(obj, Proof) else obj.query if isinstance(obj, Query) else None
+                if vector is not None and isinstance(vector.values, FieldView):
+                    vector.values.buffer.release()
+                del obj
+        finally:
+            mapped.close()
+
+    @staticmethod
+    def get_wire_size(obj: Union[Proof, Query, SparseQuery, PowerQuery]) -> int:
+        width = Integer.get_byte_width()
+
+        if isinstance(obj, Proof):
+            segment_count = len(obj.segments)
+            payload_size = obj.get_size() * width
+        elif isinstance(obj, Query):
+            segment_count = 1
+            payload_size = obj.get_size() * width
+        elif isinstance(obj, SparseQuery):
+            segment_count = 1
+            payload_size = obj.get_nonzero_count() * (WireFormat.__index.size + width)
+        else:
+            segment_count = 1
+            payload_size = WireFormat.__range.size + len(obj.terms) * 2 * width
+
+        return (WireFormat.__header.size + width + segment_count * WireFormat.__segment.size
+                + WireFormat.__payload_size.size + WireFormat.__checksum.size + payload_size)
+
+    @staticmethod
+    def __make_header(kind: int, width: int, segments: List[Tuple[str, int]], payload: bytes) -> bytes:
+        header = [
+            WireFormat.__header.pack(WireFormat.MAGIC, WireFormat.VERSION, kind, width, len(segments)),
+            int(Integer.get_base()).to_bytes(width, 'little'),
+        ]
+        for segment_kind, size in segments:
+            header.append(WireFormat.__segment.pack(WireFormat.__segment_codes[segment_kind], size))
+        header.append(WireFormat.__payload_size.pack(len(payload)))
+
+        header = b''.join(header)
+        return header + WireFormat.__checksum.pack(zlib.crc32(payload, zlib.crc32(header)))
+
+    @staticmethod
+    def __check_elements(values: Iterable[mpz]):
+        p = Integer.get_base()
+        if any(v >= p for v in values):
+            raise ValueError('element is not reduced below the prime')
+
+    @staticmethod
+    def __parse_header(buffer: memoryview) -> Tuple[int, int, List[Tuple[str, int]], int, int, int]:
+        if len(buffer) < WireFormat.__header.size:
+            raise ValueError('truncated header')
+
+        magic, version, kind, width, segment_count = WireFormat.__header.unpack_from(buffer, 0)
+        if magic != WireFormat.MAGIC:
+            raise ValueError('not a FLPW buffer')
+        if version != WireFormat.VERSION:
+            raise ValueError(f'unsupported version {version}')
+        if kind not in (WireFormat.PROOF, WireFormat.QUERY, WireFormat.SPARSE_QUERY, WireFormat.POWER_QUERY):
+            raise ValueError(f'unknown object kind {kind}')
+        if width != Integer.get_byte_width():
+            raise ValueError(f'element width {width} does not match the current prime')
+        if kind != WireFormat.PROOF and segment_count != 1:
+            raise ValueError(f'a query has one segment, not {segment_count}')
+
+        offset = WireFormat.__header.size
+        header_size = (offset + width + segment_count * WireFormat.__segment.size
+                       + WireFormat.__payload_size.size + WireFormat.__checksum.size)
+        if len(buffer) < header_size:
+            raise ValueError('truncated header')
+
+        prime = mpz(int.from_bytes(buffer[offset:offset + width], 'little'))
+        if prime != Integer.get_base():
+            raise ValueError(f'encoded for prime {prime}, but the current prime is {Integer.get_base()}')
+        offset += width
+
+        segments = []
+        for _ in range(segment_count):
+            code, size = WireFormat.__segment.unpack_from(buffer, offset)
+            segment_kind = WireFormat.__segment_kinds.get(code)
+            if segment_kind is None:
+                raise ValueError(f'unknown segment code {code}')
+            if (segment_kind == 'query') != (kind != WireFormat.PROOF):
+                raise ValueError(f'segment {segment_kind} does not belong to object kind {kind}')
+            segments.append((segment_kind, size))
+            offset += WireFormat.__segment.size
+
+        payload_size, = WireFormat.__payload_size.unpack_from(buffer, offset)
+        offset += WireFormat.__payload_size.size
+        checksum, = WireFormat.__checksum.unpack_from(buffer, offset)
+        offset += WireFormat.__checksum.size
+
+        return kind, width, segments, offset, payload_size, checksum
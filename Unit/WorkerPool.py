@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import atexit
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict
+
+
+class WorkerPool:
+    """
+    Long-lived process pools shared by the parallel prover and query answerer, one per worker count.
+    A pool is started on first use and reused by every later call with the same worker count,
+    so a multi-round proof pays the process start-up once instead of once per round.
+    Tasks must not depend on per-process state set at start-up: the field prime is passed with each task.
+    """
+
+    __executors: Dict[int, ProcessPoolExecutor] = {}
+    __lock = threading.Lock()
+
+    @staticmethod
+    def get(workers: int) -> ProcessPoolExecutor:
+        """
+        Return the pool of the given worker count, starting it on first use
+        """
+        assert workers > 1
+
+        with WorkerPool.__lock:
+            executor = WorkerPool.__executors.get(workers)
+            if executor is None:
+                executor = ProcessPoolExecutor(max_workers=workers)
+                WorkerPool.__executors[workers] = executor
+
+            return executor
+
+    @staticmethod
+    def shutdown():
+        with WorkerPool.__lock:
+            for executor in WorkerPool.__executors.values():
+                executor.shutdown()
+            WorkerPool.__executors = {}
+
+
+atexit.register(WorkerPool.shutdown)